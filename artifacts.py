@@ -0,0 +1,264 @@
+"""Bounded, content-addressed store for saliency maps and reports.
+
+Artifacts are stored under the SHA-256 of their content, so identical
+artifacts are written once and two uploads that happen to share a file name
+can never overwrite each other. The store enforces a total size budget and a
+maximum age: expired artifacts are removed first, then the least recently
+used ones until the store fits its budget again. The limits are enforced by
+``BoundedDirectory``, which the disk tier of the result cache shares.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from metrics import get_metrics
+
+
+class BoundedDirectory:
+    """Size and age limits for the entries below a directory.
+
+    An entry is a file or a directory of files, indexed with its size and
+    last access time. Expired entries are removed first, then the least
+    recently used ones until the total fits ``max_bytes``. The callers
+    record accesses in mtime (see ``touch``), so a sweep picks up entries
+    written or read by other processes.
+
+    Args:
+        root: Directory holding the entries
+        scan: Callable returning a dict of entry path to (size, last access
+            time) for every entry below ``root``
+        max_bytes: Total size budget (None for no limit)
+        max_age_seconds: Entries not accessed for this long are removed
+            (None for no limit)
+        sweep_interval: Minimum seconds between full scans of ``root``
+    """
+
+    def __init__(self, root, scan, max_bytes=None, max_age_seconds=None, sweep_interval=60):
+        self.root = root
+        self.scan = scan
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # path -> [size, last access time]
+        self._index = {}
+        self._last_sweep = 0.0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self.sweep()
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._index
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def record(self, path, size=None, timestamp=None):
+        """Record an access to ``path``; ``size`` is kept if not given."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            entry = self._index.setdefault(path, [0, timestamp])
+            entry[1] = timestamp
+            if size is not None:
+                entry[0] = size
+
+    def discard(self, path):
+        with self._lock:
+            self._index.pop(path, None)
+
+    def bytes_used(self):
+        with self._lock:
+            return sum(size for size, _ in self._index.values())
+
+    def sweep(self):
+        """Rescan ``root`` and apply the age and size limits."""
+        index = {path: list(entry) for path, entry in self.scan(self.root).items()}
+        with self._lock:
+            self._index = index
+            self._last_sweep = time.time()
+        self._evict()
+
+    def enforce_budget(self):
+        """Apply the limits after a write, rescanning if the last sweep is old."""
+        over_budget = self.max_bytes is not None and self.bytes_used() > self.max_bytes
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+        elif over_budget:
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            by_age = sorted(self._index.items(), key=lambda item: item[1][1])
+            total = sum(size for size, _ in self._index.values())
+            victims = []
+            for path, (size, last_access) in by_age:
+                expired = self.max_age_seconds is not None and now - last_access > self.max_age_seconds
+                over_budget = self.max_bytes is not None and total > self.max_bytes
+                if not (expired or over_budget):
+                    break
+                victims.append(path)
+                total -= size
+            for path in victims:
+                del self._index[path]
+            self.evictions += len(victims)
+
+        for path in victims:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def scan_files(root):
+    """``BoundedDirectory`` scan with every file below ``root`` as an entry."""
+    index = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".tmp"):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # mtime doubles as the last access time, see touch()
+            index[path] = (stat.st_size, stat.st_mtime)
+    return index
+
+
+class ArtifactStore:
+    """Content-addressed files under ``root`` with size and age limits.
+
+    Args:
+        root: Directory holding the artifacts
+        max_bytes: Total size budget (None for no limit)
+        max_age_seconds: Artifacts not accessed for this long are removed
+            (None for no limit)
+        sweep_interval: Minimum seconds between full scans of ``root``, which
+            pick up artifacts written by other processes
+    """
+
+    def __init__(self, root, max_bytes=None, max_age_seconds=None, sweep_interval=60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.dedup_hits = 0
+        self._files = BoundedDirectory(root, scan_files, max_bytes, max_age_seconds, sweep_interval)
+
+    @property
+    def evictions(self):
+        return self._files.evictions
+
+    def path_for(self, digest, suffix):
+        # Fan out by prefix to keep directories small
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def put(self, data, suffix=""):
+        """Store ``data`` (bytes) and return its path; identical data is stored once."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, suffix)
+        now = time.time()
+
+        if path in self._files and os.path.exists(path):
+            with self._lock:
+                self.dedup_hits += 1
+            self._files.record(path, timestamp=now)
+            touch(path, now)
+            return path
+
+        with get_metrics().span("artifact_write"):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write atomically so readers never see a partial artifact
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        self._files.record(path, len(data), now)
+        self._files.enforce_budget()
+        return path
+
+    def get(self, path):
+        """Return the content of a stored artifact, or None if it was evicted."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            self._files.discard(path)
+            return None
+
+        now = time.time()
+        touch(path, now)
+        with self._lock:
+            self.hits += 1
+        self._files.record(path, len(data), now)
+        return data
+
+    def bytes_used(self):
+        return self._files.bytes_used()
+
+    def sweep(self):
+        """Rescan ``root`` and apply the age and size limits."""
+        self._files.sweep()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            hits, misses, dedup_hits = self.hits, self.misses, self.dedup_hits
+        return {
+            "artifacts": len(self._files),
+            "bytes_used": self._files.bytes_used(),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else None,
+            "dedup_hits": dedup_hits,
+            "evictions": self._files.evictions,
+        }
+
+
+def touch(path, timestamp):
+    # Record the access in mtime: atime is often disabled (noatime mounts)
+    try:
+        os.utime(path, (timestamp, timestamp))
+    except OSError:
+        pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Return the process-wide artifact store.
+
+    Configured with ``NEUROLENS_ARTIFACT_DIR`` (default ``artifact_store``),
+    ``NEUROLENS_ARTIFACT_MAX_MB`` (default 512) and
+    ``NEUROLENS_ARTIFACT_MAX_AGE_HOURS`` (default 24).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                max_mb = float(os.environ.get("NEUROLENS_ARTIFACT_MAX_MB", 512))
+                max_age_hours = float(os.environ.get("NEUROLENS_ARTIFACT_MAX_AGE_HOURS", 24))
+                _store = ArtifactStore(
+                    os.environ.get("NEUROLENS_ARTIFACT_DIR", "artifact_store"),
+                    max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+                    max_age_seconds=max_age_hours * 3600 if max_age_hours > 0 else None,
+                )
+    return _store
@@ -0,0 +1,191 @@
+"""SmoothGrad and Integrated Gradients attributions in batched gradient calls.
+
+The vanilla input gradient is noisy. SmoothGrad averages the gradients of
+noisy copies of the scan, and Integrated Gradients accumulates the gradients
+along the path from a black image to the scan. Both need tens of gradient
+evaluations, so instead of a Python loop the copies are stacked into batches
+for the fused ``inference_fn``. The batches are chunked so the activations
+kept for the backward pass stay under ``NEUROLENS_SALIENCY_MEMORY_MB``.
+
+The result has the shape of an input gradient, so ``saliency_heatmaps`` and
+``saliency_overlays`` turn it into a saliency map as usual. With
+``all_classes`` the attribution of every class comes from the same batches
+(see ``inference.build_class_saliency_fn``). Grad-CAM, the
+other selectable method, needs no input gradients at all and comes out of
+the prediction pass (see ``inference.build_gradcam_fn``).
+"""
+import os
+
+import numpy as np
+
+from inference import run_class_saliency, run_inference
+from metrics import get_metrics
+
+SALIENCY_METHODS = {
+    "gradient": "Gradient",
+    "smoothgrad": "SmoothGrad",
+    "integrated_gradients": "Integrated Gradients",
+    "gradcam": "Grad-CAM",
+}
+
+SALIENCY_METHOD = os.environ.get("NEUROLENS_SALIENCY_METHOD", "gradient")
+SMOOTHGRAD_SAMPLES = int(os.environ.get("NEUROLENS_SMOOTHGRAD_SAMPLES", 25))
+# Standard deviation of the SmoothGrad noise, as a fraction of the input range
+SMOOTHGRAD_NOISE = float(os.environ.get("NEUROLENS_SMOOTHGRAD_NOISE", 0.15))
+IG_STEPS = int(os.environ.get("NEUROLENS_IG_STEPS", 32))
+SALIENCY_MEMORY_MB = float(os.environ.get("NEUROLENS_SALIENCY_MEMORY_MB", 1024))
+# Draw the saliency map of every class, not only the explained one
+ALL_CLASS_SALIENCY = os.environ.get("NEUROLENS_ALL_CLASS_SALIENCY", "").lower() in ("1", "true", "yes")
+
+
+def method_samples(method, samples=None):
+    """Number of gradient evaluations ``method`` uses (its default if None)."""
+    if method == "smoothgrad":
+        return samples or SMOOTHGRAD_SAMPLES
+    if method == "integrated_gradients":
+        return samples or IG_STEPS
+    return 1
+
+
+def method_variant(method, samples=None):
+    """Identifies a method and its sample count, e.g. in a ``result_key`` variant."""
+    if method == "gradient":
+        return ""
+    if method == "gradcam":
+        return method
+    variant = f"{method}{method_samples(method, samples)}"
+    return variant + f"@{SMOOTHGRAD_NOISE:g}" if method == "smoothgrad" else variant
+
+
+def _activation_elements(model):
+    total = 0
+    for layer in model.layers:
+        if getattr(layer, "layers", None):
+            # Nested models, e.g. a pretrained base
+            total += _activation_elements(layer)
+            continue
+        try:
+            shape = layer.output.shape
+        except (AttributeError, ValueError):
+            continue
+        total += int(np.prod([dim for dim in shape[1:] if dim is not None]))
+    return total
+
+
+# (model key, version) -> estimated bytes per sample of a gradient call
+_bytes_per_sample = {}
+
+
+def chunk_size(model_entry, memory_mb=None):
+    """Samples per gradient call that keep ``model_entry`` under ``memory_mb``.
+
+    The estimate counts every layer output of one sample as kept for the
+    backward pass. TensorFlow releases some of them early, so the real peak
+    is lower and the estimate errs on the safe side.
+    """
+    memory_mb = SALIENCY_MEMORY_MB if memory_mb is None else memory_mb
+    version = (model_entry.key, model_entry.version)
+    if version not in _bytes_per_sample:
+        # float32 activations
+        _bytes_per_sample[version] = max(4 * _activation_elements(model_entry.model), 1)
+    per_sample = _bytes_per_sample[version]
+    return max(1, int(memory_mb * 1024 * 1024 // per_sample))
+
+
+def _accumulate_gradients(model_entry, make_batch, total, class_index, memory_mb, all_classes=False):
+    """Sum the gradients of ``total`` inputs built chunk by chunk by ``make_batch(start, stop)``."""
+    # The persistent tape keeps the activations once for all classes, so
+    # the chunks are as large as for one
+    chunk = chunk_size(model_entry, memory_mb)
+    summed = None
+    for start in range(0, total, chunk):
+        batch = make_batch(start, min(start + chunk, total))
+        if all_classes:
+            _, gradients = run_class_saliency(model_entry.class_saliency_fn, batch)
+        else:
+            _, gradients = run_inference(model_entry.inference_fn, batch, class_index)
+        partial = gradients.sum(axis=0, keepdims=True)
+        summed = partial if summed is None else summed + partial
+    return summed
+
+
+def smoothgrad(model_entry, img_array, class_index, samples=None, noise=None, memory_mb=None, seed=0,
+               all_classes=False):
+    """Mean gradient of ``samples`` noisy copies of the image.
+
+    Args:
+        model_entry: ``ModelEntry`` whose ``inference_fn`` is differentiated
+        img_array: Batch of shape (1, H, W, 3) scaled to [0, 1]
+        class_index: Class to take gradients for
+        samples: Noisy copies (default ``SMOOTHGRAD_SAMPLES``)
+        noise: Noise standard deviation as a fraction of the input range
+            (default ``SMOOTHGRAD_NOISE``)
+        memory_mb: Peak memory budget (default ``SALIENCY_MEMORY_MB``)
+        seed: Seed of the noise, fixed so results can be cached
+        all_classes: Attribute every class instead of ``class_index``
+
+    Returns:
+        float32 array of shape (1, H, W, 3), or (1, classes, H, W, 3) with
+        ``all_classes``
+    """
+    samples = method_samples("smoothgrad", samples)
+    sigma = (SMOOTHGRAD_NOISE if noise is None else noise) * float(img_array.max() - img_array.min() or 1)
+    rng = np.random.default_rng(seed)
+
+    def make_batch(start, stop):
+        # Noise is drawn per chunk, so only one chunk of copies is in memory
+        return img_array + rng.normal(0, sigma, (stop - start,) + img_array.shape[1:]).astype(np.float32)
+
+    return _accumulate_gradients(model_entry, make_batch, samples, class_index, memory_mb, all_classes) / samples
+
+
+def integrated_gradients(model_entry, img_array, class_index, steps=None, baseline=None, memory_mb=None,
+                         all_classes=False):
+    """Integrated Gradients from ``baseline`` (black by default) to the image.
+
+    The path integral is a midpoint Riemann sum over ``steps`` points
+    (default ``IG_STEPS``). Other arguments are as for ``smoothgrad``.
+
+    Returns:
+        float32 array of shape (1, H, W, 3), or (1, classes, H, W, 3) with
+        ``all_classes``
+    """
+    steps = method_samples("integrated_gradients", steps)
+    baseline = np.zeros_like(img_array) if baseline is None else np.asarray(baseline, dtype=np.float32)
+    difference = img_array - baseline
+    alphas = ((np.arange(steps, dtype=np.float32) + 0.5) / steps)[:, None, None, None]
+
+    def make_batch(start, stop):
+        return baseline + alphas[start:stop] * difference
+
+    summed = _accumulate_gradients(model_entry, make_batch, steps, class_index, memory_mb, all_classes)
+    return (difference[:, np.newaxis] if all_classes else difference) * summed / steps
+
+
+def attribution_gradients(model_entry, img_array, class_index, method, samples=None, memory_mb=None,
+                          all_classes=False):
+    """Input attribution of ``class_index`` by ``method``, in place of the input gradient.
+
+    Args:
+        method: One of ``SALIENCY_METHODS``
+        samples: SmoothGrad samples or Integrated Gradients steps
+        all_classes: Attribute every class instead of ``class_index``
+
+    Returns:
+        float32 array of shape (1, H, W, 3), or (1, classes, H, W, 3) with
+        ``all_classes``
+    """
+    with get_metrics().span("attribution", method=method):
+        if method == "smoothgrad":
+            return smoothgrad(model_entry, img_array, class_index, samples, memory_mb=memory_mb,
+                              all_classes=all_classes)
+        if method == "integrated_gradients":
+            return integrated_gradients(model_entry, img_array, class_index, samples, memory_mb=memory_mb,
+                                        all_classes=all_classes)
+        if method == "gradient":
+            if all_classes:
+                return run_class_saliency(model_entry.class_saliency_fn, img_array)[1]
+            return run_inference(model_entry.inference_fn, img_array, class_index)[1]
+    if method == "gradcam":
+        raise ValueError("Grad-CAM has no input attribution; use inference.run_gradcam")
+    raise ValueError(f"Unknown saliency method: {method}")
@@ -0,0 +1,193 @@
+"""Classify a directory tree of MRI scans without the Streamlit UI.
+
+Images are decoded and resized by a parallel, prefetching ``tf.data``
+pipeline and scored in batches. Results are written to a CSV or Parquet file
+(picked from the output extension), one row per image.
+
+Usage:
+    python batch_classify.py sample_images --model Xception --output predictions.csv
+    python batch_classify.py /data/archive --output scores.parquet --saliency-dir saliency_out
+    python batch_classify.py /data/archive --backend tflite-int8
+    python batch_classify.py /data/archive --tta 8
+
+If the images sit in ``<root>/<class>/`` folders, like ``sample_images/``,
+the folder name is recorded in a ``folder`` column for easy comparison.
+
+With ``--tta N`` every image is classified from N augmented views stacked
+into the same forward pass; the mean is reported and the per-class variance
+is written to ``var_<class>`` columns.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from imaging import load_image_array
+from inference import run_inference
+from models import LABELS, MODEL_FILES, get_registry
+from saliency import saliency_overlays
+from tflite_backend import BACKENDS, backend_quantization, get_tflite_model
+from tta import MAX_VIEWS, expand_views, reduce_views
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def find_images(root):
+    """Return sorted paths of all images below ``root``."""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(dirpath, filename))
+    return sorted(paths)
+
+
+def load_image(path, img_size):
+    """Decode and resize one image the same way the Analysis page does.
+
+    The page's own preprocessing runs inside the pipeline (see
+    ``load_image_array``). With a plain ``tf.image`` resize, inputs from
+    large scans differed from those of the page (a mean absolute difference
+    of about 0.002 on a 1600 px scan).
+
+    Returns:
+        A tuple of (path, image, readable); an unreadable file is reported
+        on one line and yields an all-zero image with ``readable`` False
+    """
+    def decode(path_bytes):
+        try:
+            return load_image_array(path_bytes.decode(), img_size), True
+        except (OSError, ValueError) as e:
+            # PIL raises UnidentifiedImageError (an OSError) for non-images
+            print(f"Warning: skipping {path_bytes.decode()} ({type(e).__name__})", file=sys.stderr)
+            return np.zeros(tuple(img_size) + (3,), dtype=np.float32), False
+
+    img, readable = tf.numpy_function(decode, [path], (tf.float32, tf.bool))
+    img.set_shape(tuple(img_size) + (3,))
+    return path, img, readable
+
+
+def build_dataset(paths, img_size, batch_size):
+    dataset = tf.data.Dataset.from_tensor_slices(paths)
+    dataset = dataset.map(lambda path: load_image(path, img_size), num_parallel_calls=tf.data.AUTOTUNE)
+    # Skip unreadable files instead of aborting the whole run; they are
+    # reported as missing at the end
+    dataset = dataset.filter(lambda path, img, readable: readable)
+    dataset = dataset.map(lambda path, img, readable: (path, img))
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def saliency_path_for(path, root, saliency_dir):
+    relative = os.path.splitext(os.path.relpath(path, root))[0]
+    return os.path.join(saliency_dir, relative + ".png")
+
+
+def classify_directory(root, model_key, batch_size=32, saliency_dir=None, backend="keras", tta_views=1):
+    """Score every image below ``root`` and return the results as a DataFrame.
+
+    With a TFLite ``backend`` the probabilities come from the TFLite model;
+    the Keras model is then only loaded if saliency maps are requested.
+    With ``tta_views`` > 1 each forward pass covers ``batch_size`` images
+    times ``tta_views`` views.
+    """
+    paths = find_images(root)
+    if not paths:
+        raise ValueError(f"No images found under {root}")
+
+    quantization = backend_quantization(backend)
+    tflite_model = get_tflite_model(model_key, quantization) if quantization else None
+    model_entry = get_registry().get(model_key) if tflite_model is None or saliency_dir else None
+    img_size = tflite_model.img_size if tflite_model is not None else model_entry.img_size
+
+    rows = []
+    for batch_paths, images in build_dataset(paths, img_size, batch_size):
+        overlays, variance = None, None
+        if tflite_model is not None or saliency_dir is None or tta_views > 1:
+            views = expand_views(images.numpy(), tta_views)
+            if tflite_model is not None:
+                probabilities = tflite_model.predict(views)
+            else:
+                probabilities = model_entry.predict_fn(views).numpy()
+            probabilities, variance = reduce_views(probabilities, tta_views)
+            if saliency_dir is not None:
+                # Gradients of the predicted classes of the original images
+                _, gradients = run_inference(model_entry.inference_fn, images, np.argmax(probabilities, axis=1))
+                overlays = saliency_overlays(gradients, images.numpy() * 255.0)
+        else:
+            probabilities, gradients = run_inference(model_entry.inference_fn, images)
+            overlays = saliency_overlays(gradients, images.numpy() * 255.0)
+
+        for i, path in enumerate(batch_paths.numpy()):
+            path = path.decode()
+            class_index = int(np.argmax(probabilities[i]))
+            row = {
+                "path": path,
+                "folder": os.path.basename(os.path.dirname(path)),
+                "model": model_key,
+                "backend": backend,
+                "prediction": LABELS[class_index],
+                "confidence": float(probabilities[i][class_index]),
+            }
+            row.update({f"prob_{label}": float(p) for label, p in zip(LABELS, probabilities[i])})
+            if tta_views > 1:
+                row.update({f"var_{label}": float(v) for label, v in zip(LABELS, variance[i])})
+
+            if overlays is not None:
+                out_path = saliency_path_for(path, root, saliency_dir)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                cv2.imwrite(out_path, cv2.cvtColor(overlays[i], cv2.COLOR_RGB2BGR))
+                row["saliency_path"] = out_path
+
+            rows.append(row)
+
+    skipped = len(paths) - len(rows)
+    if skipped:
+        print(f"Warning: skipped {skipped} unreadable image(s)", file=sys.stderr)
+    return pd.DataFrame(rows)
+
+
+def write_results(df, output):
+    if output.lower().endswith(".parquet"):
+        try:
+            df.to_parquet(output, index=False)
+        except ImportError as e:
+            raise SystemExit(f"Writing Parquet requires pyarrow: {e}")
+    else:
+        df.to_csv(output, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-classify brain MRI scans")
+    parser.add_argument("input_dir", help="Directory tree containing .jpg/.jpeg/.png images")
+    parser.add_argument("--model", default="Xception", choices=list(MODEL_FILES),
+                        help="Model to use (default: %(default)s)")
+    parser.add_argument("--output", default="predictions.csv",
+                        help="Output file; a .parquet extension writes Parquet (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Images per forward pass (default: %(default)s)")
+    parser.add_argument("--saliency-dir", default=None,
+                        help="Also write saliency overlays as PNGs mirroring the input tree")
+    parser.add_argument("--backend", default="keras", choices=BACKENDS,
+                        help="Inference backend; TFLite models come from export_models.py --tflite "
+                             "(default: %(default)s)")
+    parser.add_argument("--tta", type=int, default=1, choices=range(1, MAX_VIEWS + 1), metavar="N",
+                        help=f"Test-time augmentation views per image, 1-{MAX_VIEWS} (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = classify_directory(args.input_dir, args.model, args.batch_size, args.saliency_dir, args.backend, args.tta)
+    elapsed = time.perf_counter() - start
+
+    write_results(df, args.output)
+    print(f"Classified {len(df)} images with {args.model} ({args.backend}"
+          + (f", {args.tta} views" if args.tta > 1 else "") + f") in {elapsed:.1f}s "
+          f"({len(df) / elapsed:.1f} images/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Per-stage benchmark of the analysis pipeline.
+
+Every image in ``sample_images/`` is pushed through each stage of the
+Analysis page, for each model:
+
+    decode        process_image_input + preprocess (the app's path)
+    decode_keras  keras load_img + img_to_array (the original path)
+    inference     fused prediction and input gradients
+    saliency      generate_saliency_map from those gradients
+    segmentation  segment_tumors, gated by the saliency heatmap
+    explanation   generate_explanation with a local stub instead of Gemini
+    report        generate_report
+
+and p50/p95/p99 latencies are reported per stage, together with the
+throughput of the compiled model at several batch sizes and the peak RSS.
+Each model is measured in a fresh interpreter, so its peak RSS is its own
+rather than that of every model loaded before it. Results are written as JSON and can be compared against a
+stored baseline; any stage slower (or throughput lower) than the baseline by
+more than ``--threshold`` counts as a regression and makes the run exit 1.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline --output bench.json
+    python -m benchmarks.pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.pipeline --baseline benchmarks/baseline.json --threshold 0.1
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import PIL.Image
+import tensorflow as tf
+
+from batch_classify import find_images
+from explanations import ExplanationService, build_prompt
+from imaging import preprocess, process_image_input
+from inference import generate_saliency_map, run_inference
+from models import LABELS, MODEL_FILES, get_registry
+from reports import generate_report
+from segmentation import segment_tumors
+
+STAGES = ("decode", "decode_keras", "inference", "saliency", "segmentation", "explanation", "report")
+
+
+def stub_explanation(latency_seconds=0.0):
+    """Return a stand-in for ``generate_explanation`` that never calls Gemini.
+
+    It does the local work of a real request (prompt, PNG encoding of the
+    saliency map) and then sleeps for ``latency_seconds`` to model the API.
+    """
+    def generate(saliency_map, model_prediction, confidence, timeout=None):
+        prompt = build_prompt(model_prediction, confidence)
+        PIL.Image.fromarray(saliency_map).save(io.BytesIO(), format="PNG")
+        time.sleep(latency_seconds)
+        return f"{model_prediction}: stub explanation ({len(prompt)} prompt characters)"
+
+    return generate
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def time_stages(model_entry, paths, explanation_service, repeats):
+    """Run every stage on every image and return the latencies per stage."""
+    timings = {stage: [] for stage in STAGES}
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    def decode(path):
+        _, display_img, _ = process_image_input(path)
+        return display_img, np.expand_dims(preprocess(display_img, model_entry.img_size), axis=0)
+
+    def decode_keras(path):
+        img = tf.keras.utils.load_img(path, target_size=model_entry.img_size)
+        return np.expand_dims(tf.keras.utils.img_to_array(img) / 255.0, axis=0)
+
+    for _ in range(repeats):
+        for path in paths:
+            display_img, img_array = timed("decode", decode, path)
+            timed("decode_keras", decode_keras, path)
+            probabilities, gradients = timed("inference", run_inference, model_entry.inference_fn, img_array)
+            class_index = int(np.argmax(probabilities[0]))
+            prediction, confidence = LABELS[class_index], float(probabilities[0][class_index])
+            saliency_map, heatmap = timed("saliency", generate_saliency_map, model_entry.inference_fn,
+                                          img_array, class_index, gradients, True)
+            original_img = np.rint(img_array[0] * 255).astype(np.uint8)
+            segmentation = timed("segmentation", segment_tumors, [original_img], [prediction], [heatmap])[0]
+            explanation = timed("explanation", lambda: explanation_service.submit(
+                saliency_map, prediction, confidence).result())
+            timed("report", generate_report, original_img, saliency_map, prediction, confidence, explanation,
+                  segmentation, original_img)
+    return timings
+
+
+def measure_throughput(model_entry, paths, batch_sizes, min_seconds):
+    """Images per second of the compiled functions at each batch size."""
+    images = np.stack([preprocess(process_image_input(path)[1], model_entry.img_size) for path in paths])
+    results = {}
+    for batch_size in batch_sizes:
+        batch = tf.constant(np.resize(images, (batch_size,) + images.shape[1:]))
+        results[str(batch_size)] = {}
+        for name, fn in (("predict", lambda: model_entry.predict_fn(batch).numpy()),
+                         ("predict_and_gradients", lambda: run_inference(model_entry.inference_fn, batch))):
+            # First call selects kernels for the new shape
+            fn()
+            runs, start = 0, time.perf_counter()
+            while runs == 0 or time.perf_counter() - start < min_seconds:
+                fn()
+                runs += 1
+            results[str(batch_size)][name] = runs * batch_size / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_model(model_key, image_dir, batch_sizes, repeats=1, min_seconds=2.0, stub_latency=0.0):
+    """Benchmark ``model_key`` in this process and return its results."""
+    paths = find_images(image_dir)
+    if not paths:
+        raise ValueError(f"No images found under {image_dir}")
+    # No cache: every request runs the stub, as a cache miss would
+    explanation_service = ExplanationService(stub_explanation(stub_latency), max_entries=0)
+
+    model_entry = get_registry().get(model_key)
+    # Untimed pass so one-off tracing does not skew the percentiles
+    time_stages(model_entry, paths[:1], explanation_service, 1)
+    timings = time_stages(model_entry, paths, explanation_service, repeats)
+    return {
+        "load_seconds": model_entry.load_seconds,
+        "stages": {stage: summarize(seconds) for stage, seconds in timings.items()},
+        "throughput": measure_throughput(model_entry, paths, batch_sizes, min_seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(model_keys, image_dir, batch_sizes, repeats=1, min_seconds=2.0, stub_latency=0.0):
+    """Benchmark each of ``model_keys`` in a fresh process and collect the results."""
+    results = {
+        "environment": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "tensorflow": tf.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "images": len(find_images(image_dir)),
+            "repeats": repeats,
+        },
+        "models": {},
+    }
+    for model_key in model_keys:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline", "--child", model_key, "--images", image_dir,
+             "--batch-sizes", *map(str, batch_sizes), "--repeats", str(repeats),
+             "--min-seconds", str(min_seconds), "--stub-latency-ms", str(stub_latency * 1000)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results["models"][model_key] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regressions of ``results`` relative to ``baseline``."""
+    regressions = []
+    for model_key, current in results["models"].items():
+        reference = baseline.get("models", {}).get(model_key)
+        if reference is None:
+            continue
+        for stage, stats in current["stages"].items():
+            for metric in ("p50_ms", "p95_ms"):
+                old = reference["stages"].get(stage, {}).get(metric)
+                if old and stats[metric] > old * (1 + threshold):
+                    regressions.append(f"{model_key} {stage} {metric}: {old:.1f} -> {stats[metric]:.1f}")
+        for batch_size, rates in current["throughput"].items():
+            for name, rate in rates.items():
+                old = reference["throughput"].get(batch_size, {}).get(name)
+                if old and rate < old * (1 - threshold):
+                    regressions.append(f"{model_key} batch {batch_size} {name}: "
+                                       f"{old:.1f} -> {rate:.1f} images/s")
+    return regressions
+
+
+def print_summary(results):
+    for model_key, model_results in results["models"].items():
+        print(f"\n{model_key} (peak RSS {model_results['peak_rss_mb']:.0f} MB)")
+        print(f"  {'stage':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, stats in model_results["stages"].items():
+            print(f"  {stage:<14}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+        print(f"  {'batch':<14}{'predict/s':>12}{'+grads/s':>12}")
+        for batch_size, rates in model_results["throughput"].items():
+            print(f"  {batch_size:<14}{rates['predict']:>12.1f}{rates['predict_and_gradients']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NeuroLens analysis pipeline per stage")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES),
+                        help="Models to benchmark (default: all)")
+    parser.add_argument("--images", default="sample_images",
+                        help="Directory of benchmark images (default: %(default)s)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16],
+                        help="Batch sizes for the throughput runs (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Passes over the images for the stage latencies (default: %(default)s)")
+    parser.add_argument("--min-seconds", type=float, default=2.0,
+                        help="Minimum duration of each throughput measurement (default: %(default)s)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0,
+                        help="Simulated Gemini latency of the explanation stub (default: %(default)s)")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown that counts as a regression (default: %(default)s)")
+    parser.add_argument("--save-baseline", default=None, help="Also store the results as a new baseline")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(benchmark_model(args.child, args.images, args.batch_sizes, args.repeats,
+                                         args.min_seconds, args.stub_latency_ms / 1000)))
+        return
+
+    results = run_benchmarks(args.models, args.images, args.batch_sizes, args.repeats,
+                             args.min_seconds, args.stub_latency_ms / 1000)
+    print_summary(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nWrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
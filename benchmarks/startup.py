@@ -0,0 +1,112 @@
+"""Cold-start cost of each page of the Streamlit app.
+
+Every page is rendered in a fresh interpreter with Streamlit's AppTest
+harness, as the first request of a new process would be. For each page the
+time to import Streamlit, the time of the first render, the peak RSS and the
+heavy dependencies that ended up imported are reported.
+
+Opening the Analysis page starts model warm-up in the background, which
+would add to its peak RSS, so it is disabled here unless ``--with-warmup``
+is given.
+
+Usage (from the repository root):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --pages Home About --repeats 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+PAGES = ("Home", "Analysis", "History", "About")
+
+# Modules whose presence after a render shows what a page pulled in
+HEAVY_MODULES = ("tensorflow", "keras", "cv2", "google.generativeai", "plotly", "pandas", "skimage", "matplotlib")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def render_page(page, timeout):
+    """Render ``page`` once in this process and return its measurements."""
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_seconds = time.perf_counter() - start
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.session_state["current_page"] = page
+    start = time.perf_counter()
+    app.run()
+    render_seconds = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "streamlit_import_seconds": streamlit_seconds,
+        "render_seconds": render_seconds,
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        "peak_rss_mb": peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        "exceptions": [exception.message for exception in app.exception],
+    }
+
+
+def measure_page(page, repeats, timeout, with_warmup):
+    env = dict(os.environ)
+    if not with_warmup:
+        env["NEUROLENS_WARMUP_MODELS"] = "none"
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", page, "--timeout", str(timeout)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "render_seconds_median": statistics.median(run["render_seconds"] for run in runs),
+        "streamlit_import_seconds_median": statistics.median(run["streamlit_import_seconds"] for run in runs),
+        "peak_rss_mb_median": statistics.median(run["peak_rss_mb"] for run in runs),
+        "heavy_modules": runs[-1]["heavy_modules"],
+        "exceptions": runs[-1]["exceptions"],
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold-start cost of each app page")
+    parser.add_argument("--pages", nargs="+", default=list(PAGES), choices=PAGES,
+                        help="Pages to measure (default: all)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Fresh processes per page (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="Seconds allowed for one render (default: %(default)s)")
+    parser.add_argument("--with-warmup", action="store_true",
+                        help="Keep model warm-up enabled in the measured processes")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(render_page(args.child, args.timeout)), flush=True)
+        # Warm-up may still be running in TensorFlow, which aborts when the
+        # interpreter is finalized under it
+        os._exit(0)
+
+    results = {page: measure_page(page, args.repeats, args.timeout, args.with_warmup) for page in args.pages}
+    print(f"{'page':<10}{'render s':>10}{'streamlit s':>13}{'peak RSS MB':>13}  heavy modules")
+    for page, result in results.items():
+        print(f"{page:<10}{result['render_seconds_median']:>10.2f}{result['streamlit_import_seconds_median']:>13.2f}"
+              f"{result['peak_rss_mb_median']:>13.0f}  {', '.join(result['heavy_modules']) or '-'}")
+        for message in result["exceptions"]:
+            print(f"  {page} raised: {message}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
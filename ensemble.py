@@ -0,0 +1,292 @@
+"""Ensemble of every model in ``MODEL_FILES`` on one decoded scan.
+
+The upload is decoded once and each model's input is resized from that same
+array. The models then run concurrently in a small thread pool (TensorFlow
+releases the GIL while it executes), so an ensemble analysis costs about as
+much as the slowest model alone. Per-model results are cached under each
+model's own ``result_key``, exactly like single-model analyses, so switching
+between a model and the ensemble never recomputes anything and bundled
+samples need no inference at all.
+
+Probabilities are combined by a weighted average. The weights come from
+``NEUROLENS_ENSEMBLE_WEIGHTS`` (e.g. ``Xception=2,Custom CNN=1``) and are
+equal by default.
+
+With ``all_classes`` a result also holds the saliency map of every class,
+drawn from one forward pass, so the page can switch between them without
+running the model again.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from attribution import attribution_gradients, method_variant
+from imaging import preprocess
+from inference import run_class_saliency, run_gradcam, run_inference
+from metrics import get_metrics
+from models import LABELS, MODEL_FILES
+from result_cache import get_result_cache, result_key
+from saliency import gradcam_heatmaps, saliency_heatmaps, saliency_overlays
+from sample_bundle import get_sample_bundle
+from tta import expand_views, record_cost, reduce_views
+
+
+def parse_weights(spec):
+    """Parse ``"Xception=2,Custom CNN=1"`` into a dict of model key to weight."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model_key, _, weight = item.rpartition("=")
+        if model_key not in MODEL_FILES:
+            raise ValueError(f"Unknown model in ensemble weights: {model_key!r}")
+        weights[model_key] = float(weight)
+    return weights
+
+
+ENSEMBLE_WEIGHTS = parse_weights(os.environ.get("NEUROLENS_ENSEMBLE_WEIGHTS", ""))
+
+
+def combine(model_probabilities, weights=None):
+    """Weighted average of per-model probabilities.
+
+    Args:
+        model_probabilities: Dict of model key to probabilities in ``LABELS``
+            order
+        weights: Dict of model key to weight (default ``ENSEMBLE_WEIGHTS``);
+            models without a weight count once
+    """
+    weights = ENSEMBLE_WEIGHTS if weights is None else weights
+    model_keys = list(model_probabilities)
+    w = np.array([weights.get(model_key, 1.0) for model_key in model_keys], dtype=np.float32)
+    stacked = np.stack([np.asarray(model_probabilities[model_key], dtype=np.float32) for model_key in model_keys])
+    return (w[:, None] * stacked).sum(axis=0) / w.sum()
+
+
+def result_variant(backend, tflite_model, tta_views=1, saliency_method="gradient", saliency_samples=None,
+                   all_classes=False):
+    """The ``result_key`` variant of a model run with the given options."""
+    parts = [] if tflite_model is None else [f"{backend}:{tflite_model.version}"]
+    if tta_views > 1:
+        parts.append(f"tta{tta_views}")
+    if saliency_method != "gradient":
+        parts.append(method_variant(saliency_method, saliency_samples))
+    if all_classes:
+        parts.append("all")
+    return ":".join(parts)
+
+
+def unstack_classes(stacked):
+    """Split the ``class_saliency_maps`` or ``class_saliency_heatmaps`` of a
+    result into one image per class, in ``LABELS`` order."""
+    stacked = np.asarray(stacked)
+    return stacked.reshape((len(LABELS), -1) + stacked.shape[1:])
+
+
+def _heatmaps(model_entry, img_array, class_index, saliency_method, saliency_samples, all_classes,
+              gradients=None, cams=None):
+    """Saliency heatmaps of shape (1, H, W), or (classes, H, W) with ``all_classes``.
+
+    ``gradients`` and ``cams`` are those of the prediction pass, if any.
+    """
+    if saliency_method == "gradcam":
+        if cams is None:
+            if all_classes:
+                _, cams = run_class_saliency(model_entry.class_gradcam_fn, img_array)
+            else:
+                _, cams = run_gradcam(model_entry.gradcam_fn, img_array, class_index)
+        return gradcam_heatmaps(cams[0] if all_classes else cams, *model_entry.img_size)
+    if gradients is None:
+        gradients = attribution_gradients(model_entry, img_array, class_index, saliency_method, saliency_samples,
+                                          all_classes=all_classes)
+    return saliency_heatmaps(gradients[0] if all_classes else gradients)
+
+
+def analyse_model(model_key, model_entry, display_img, tflite_model=None, class_index=None, tta_views=1,
+                  saliency_method="gradient", saliency_samples=None, all_classes=False, backend="keras"):
+    """Classify a decoded scan with one model and draw its saliency map.
+
+    Args:
+        display_img: RGB uint8 array from ``process_image_input``
+        tflite_model: Optional ``TFLiteModel`` for the prediction; the
+            saliency map always comes from the Keras model
+        class_index: Class the saliency map explains (default: the
+            predicted one)
+        tta_views: Number of test-time augmentation views, classified
+            together in one forward pass (1 for none)
+        saliency_method: One of ``attribution.SALIENCY_METHODS``
+        saliency_samples: SmoothGrad samples or Integrated Gradients steps
+            (default: the method's configured count)
+        all_classes: Also draw the saliency maps of the other classes; the
+            forward pass is shared by all of them
+        backend: The backend ``tflite_model`` belongs to, which the TTA cost
+            is recorded for
+
+    Returns:
+        A dict with ``probabilities``, ``saliency_map`` and
+        ``saliency_heatmap`` (uint8), the fields of a result cache entry,
+        plus the views' ``probability_variance`` with TTA. With
+        ``all_classes``, ``class_saliency_maps`` and
+        ``class_saliency_heatmaps`` hold every class's map stacked
+        vertically in ``LABELS`` order (see ``unstack_classes``), so the
+        result cache stores each as a single image.
+    """
+    metrics = get_metrics()
+    if saliency_method == "gradcam" and model_entry.gradcam_fn is None:
+        # Without convolutional layers there is nothing to tap
+        saliency_method = "gradient"
+    with metrics.span("preprocess", model=model_key):
+        img_array = np.expand_dims(preprocess(display_img, model_entry.img_size), axis=0)
+        views = expand_views(img_array, tta_views)
+
+    gradients, cams = None, None
+    with metrics.span("predict", model=model_key):
+        start = time.perf_counter()
+        if tflite_model is not None:
+            prediction = tflite_model.predict(views)
+        elif tta_views > 1 or saliency_method in ("smoothgrad", "integrated_gradients"):
+            # The views, or the attribution below, need gradients of other
+            # inputs, so the prediction only needs a forward pass
+            prediction = model_entry.predict_fn(views).numpy()
+        elif saliency_method == "gradcam":
+            # The class activation maps come out of the prediction pass
+            if all_classes:
+                prediction, cams = run_class_saliency(model_entry.class_gradcam_fn, img_array)
+            else:
+                prediction, cams = run_gradcam(model_entry.gradcam_fn, img_array, class_index)
+        elif all_classes:
+            # One forward pass, then one backward pass per class
+            prediction, gradients = run_class_saliency(model_entry.class_saliency_fn, img_array)
+        else:
+            # One compiled pass gives both the probabilities and the
+            # gradients of the target class for the saliency map
+            prediction, gradients = run_inference(model_entry.inference_fn, img_array, class_index)
+        if tta_views > 1:
+            record_cost(model_key, backend if tflite_model is not None else "keras", tta_views,
+                        time.perf_counter() - start)
+    mean, variance = reduce_views(prediction, tta_views)
+    probabilities = mean[0]
+    if class_index is None:
+        class_index = np.argmax(probabilities)
+
+    with metrics.span("saliency", model=model_key):
+        heatmaps = _heatmaps(model_entry, img_array, class_index, saliency_method, saliency_samples, all_classes,
+                             gradients, cams)
+        # The model input itself is the image the heatmaps are drawn on
+        saliency_maps = saliency_overlays(None, np.repeat(img_array * 255.0, len(heatmaps), axis=0),
+                                          heatmaps=heatmaps)
+    heatmaps = np.rint(heatmaps * 255).astype(np.uint8)
+    shown = class_index if all_classes else 0
+    result = {
+        "probabilities": probabilities,
+        "saliency_map": saliency_maps[shown],
+        "saliency_heatmap": heatmaps[shown],
+    }
+    if all_classes:
+        result["class_saliency_maps"] = saliency_maps.reshape((-1,) + saliency_maps.shape[2:])
+        result["class_saliency_heatmaps"] = heatmaps.reshape(-1, heatmaps.shape[2])
+    if tta_views > 1:
+        result["probability_variance"] = variance[0]
+    return result
+
+
+def analyse_ensemble(image_bytes, display_img, model_entries, tflite_models=None, backend="keras", weights=None,
+                     tta_views=1, saliency_method="gradient", saliency_samples=None, all_classes=False):
+    """Analyse a decoded scan with several models at once and combine them.
+
+    Each model's result is read from the result cache or the sample bundle
+    when possible; the others are computed concurrently and cached.
+
+    Args:
+        image_bytes: The encoded scan, for the per-model cache keys
+        display_img: RGB uint8 array decoded from ``image_bytes``
+        model_entries: Dict of model key to ``ModelEntry``
+        tflite_models: Dict of model key to ``TFLiteModel`` for ``backend``
+        weights: See ``combine``
+        tta_views, saliency_method, saliency_samples, all_classes: See
+            ``analyse_model``
+
+    Returns:
+        A dict with the combined ``probabilities``, the per-model
+        ``model_probabilities``, and the ``saliency_map`` and
+        ``saliency_heatmap`` of ``saliency_model``: the model contributing
+        most to the ensemble's prediction. With TTA, the weighted average of
+        the models' ``probability_variance`` is included too, and with
+        ``all_classes`` the ``saliency_model``'s maps of every class.
+    """
+    tflite_models = tflite_models or {}
+    weights = ENSEMBLE_WEIGHTS if weights is None else weights
+    result_cache = get_result_cache()
+    sample_bundle = get_sample_bundle()
+
+    results, keys = {}, {}
+    for model_key, model_entry in model_entries.items():
+        keys[model_key] = result_key(image_bytes, model_key, model_entry.version,
+                                     variant=result_variant(backend, tflite_models.get(model_key), tta_views,
+                                                            saliency_method, saliency_samples, all_classes))
+        cached = result_cache.get(keys[model_key]) or sample_bundle.get(keys[model_key])
+        if cached is not None:
+            results[model_key] = cached
+
+    missing = [model_key for model_key in model_entries if model_key not in results]
+    if missing:
+        futures = {
+            model_key: _get_executor().submit(analyse_model, model_key, model_entries[model_key], display_img,
+                                              tflite_models.get(model_key), tta_views=tta_views,
+                                              saliency_method=saliency_method, saliency_samples=saliency_samples,
+                                              all_classes=all_classes, backend=backend)
+            for model_key in missing
+        }
+        for model_key, future in futures.items():
+            results[model_key] = future.result()
+            result_cache.put(keys[model_key], results[model_key])
+
+    model_probabilities = {model_key: np.asarray(results[model_key]["probabilities"], dtype=np.float32)
+                           for model_key in model_entries}
+    probabilities = combine(model_probabilities, weights)
+    class_index = int(np.argmax(probabilities))
+
+    # The saliency map shown is that of the model with the largest weighted
+    # vote for the ensemble's class
+    saliency_model = max(model_entries,
+                         key=lambda model_key: weights.get(model_key, 1.0) * model_probabilities[model_key][class_index])
+    saliency = results[saliency_model]
+    if "class_saliency_maps" in saliency:
+        # Every class's map is drawn already
+        saliency = dict(saliency,
+                        saliency_map=unstack_classes(saliency["class_saliency_maps"])[class_index],
+                        saliency_heatmap=unstack_classes(saliency["class_saliency_heatmaps"])[class_index])
+    elif np.argmax(model_probabilities[saliency_model]) != class_index or "saliency_heatmap" not in saliency:
+        # Its own map explains another class; draw one for the ensemble's
+        saliency = analyse_model(saliency_model, model_entries[saliency_model], display_img,
+                                 class_index=class_index, saliency_method=saliency_method,
+                                 saliency_samples=saliency_samples, all_classes=all_classes)
+
+    result = {
+        "probabilities": probabilities,
+        "model_probabilities": model_probabilities,
+        "saliency_model": saliency_model,
+        "saliency_map": saliency["saliency_map"],
+        "saliency_heatmap": saliency["saliency_heatmap"],
+    }
+    if "class_saliency_maps" in saliency:
+        result["class_saliency_maps"] = saliency["class_saliency_maps"]
+        result["class_saliency_heatmaps"] = saliency["class_saliency_heatmaps"]
+    if tta_views > 1:
+        result["probability_variance"] = combine(
+            {model_key: results[model_key]["probability_variance"] for model_key in model_entries}, weights)
+    return result
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=len(MODEL_FILES), thread_name_prefix="ensemble")
+    return _executor
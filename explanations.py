@@ -0,0 +1,143 @@
+"""Gemini explanations of saliency maps, generated in the background.
+
+Explanations run on a small worker pool so the Analysis page can render the
+prediction and chart first and fill the explanation in when it arrives.
+Successful responses are cached by (saliency image hash, predicted class,
+rounded confidence, prompt version), so reruns and repeat scans do not spend
+API quota again.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import PIL.Image
+import google.generativeai as genai
+
+from metrics import get_metrics
+
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+# Bump whenever build_prompt() changes so cached explanations are not reused
+PROMPT_VERSION = 1
+
+# Seconds to wait for Gemini per request
+EXPLANATION_TIMEOUT = float(os.environ.get("NEUROLENS_EXPLANATION_TIMEOUT", 20))
+
+
+def build_prompt(model_prediction, confidence):
+    return f"""You are an expert neurologist specializing in brain tumor diagnosis through MRI scans. You have been given a saliency map generated by a deep learning model that was trained to classify brain tumors into one of four categories: glioma, meningioma, pituitary tumor, or no tumor. The saliency map identifies which areas of the MRI scan the model is focusing on to make its prediction.
+
+                  The model has predicted the scan to belong to the class '{model_prediction}' with a confidence of {confidence * 100}%. Your task is to explain the saliency map and the reasoning behind the model's prediction.
+
+                  In your explanation:
+                  1. Identify and describe the brain regions highlighted in the saliency map, particularly those marked in light cyan. Explain how these regions are relevant to the type of tumor the model predicts, focusing on the typical locations of such tumors in the brain.
+                  2. Provide a brief, scientifically-backed rationale for why the model might have made this prediction based on the highlighted regions. Refer to general knowledge of brain tumor characteristics (e.g., gliomas often appear in specific brain regions, meningiomas are typically on the outer layers of the brain, etc.).
+                  3. Your response should avoid stating basic facts like 'The saliency map highlights areas in light cyan,' and instead focus directly on the clinical reasoning behind the model's focus on these regions.
+                  4. Limit your explanation to no more than 4 sentences.
+
+                  Please carefully consider the model's prediction and the anatomical and clinical implications of the highlighted regions. Let's think step by step about this. Verify step by step."""
+
+
+def fallback_explanation(model_prediction, confidence, reason="due to API connection issues. Please ensure your Google API key is properly configured"):
+    return f"""
+            Based on the highlighted regions in the saliency map, this appears to be a {model_prediction.lower()} with {confidence*100:.1f}% confidence.
+
+            Note: Detailed AI-powered explanation is not available {reason}.
+            """
+
+
+def generate_explanation(saliency_map, model_prediction, confidence, timeout=EXPLANATION_TIMEOUT):
+    """Ask Gemini to explain a saliency map. Raises on any API error.
+
+    Args:
+        saliency_map: The overlay as an RGB uint8 array or a PIL image
+        model_prediction: Predicted class label
+        confidence: Probability of the predicted class
+        timeout: Request timeout in seconds
+    """
+    if isinstance(saliency_map, np.ndarray):
+        saliency_map = PIL.Image.fromarray(saliency_map)
+
+    model = genai.GenerativeModel(model_name=GEMINI_MODEL)
+    with get_metrics().span("explanation"):
+        response = model.generate_content(
+            [build_prompt(model_prediction, confidence), saliency_map],
+            request_options={"timeout": timeout},
+        )
+        return response.text
+
+
+def explanation_key(saliency_map, model_prediction, confidence):
+    digest = hashlib.sha256(np.ascontiguousarray(saliency_map).tobytes())
+    digest.update(str(np.shape(saliency_map)).encode())
+    return (digest.hexdigest(), model_prediction, round(float(confidence), 2), PROMPT_VERSION)
+
+
+class ExplanationService:
+    """Runs explanation requests on a worker pool and caches the answers.
+
+    Args:
+        generate_fn: Callable with the signature of ``generate_explanation``
+        max_workers: Concurrent requests to the API
+        max_entries: Explanations kept in the cache
+    """
+
+    def __init__(self, generate_fn=generate_explanation, max_workers=4, max_entries=256):
+        self._generate_fn = generate_fn
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="explain")
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        # Requests currently running, so concurrent reruns share one API call
+        self._pending = {}
+        # Re-entrant: a future that is already done runs its callback, which
+        # takes this lock, synchronously inside submit()
+        self._lock = threading.RLock()
+
+    def submit(self, saliency_map, model_prediction, confidence, timeout=EXPLANATION_TIMEOUT):
+        """Return a Future resolving to the explanation text.
+
+        Cached answers resolve immediately; failures propagate through the
+        Future and are not cached, so a later rerun retries.
+        """
+        key = explanation_key(saliency_map, model_prediction, confidence)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return _completed(self._cache[key])
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._generate_fn, saliency_map, model_prediction, confidence, timeout)
+                self._pending[key] = future
+                future.add_done_callback(lambda done: self._finish(key, done))
+            return future
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = future.result()
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_explanation_service():
+    """Return the process-wide explanation service."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ExplanationService()
+    return _service
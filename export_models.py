@@ -0,0 +1,179 @@
+"""Export self-contained inference artifacts for the models in MODEL_FILES.
+
+Each model is rebuilt from its training checkpoint and saved as a single
+``.keras`` file holding the full graph and weights but no optimizer state, so
+the app can load it with ``load_model(..., compile=False)`` without fetching
+ImageNet weights or compiling.
+
+With ``--tflite`` the models are also converted to float16 and/or int8
+TFLite files (int8 is calibrated on ``--calibration-dir``), and a parity
+report comparing them with the Keras model is printed and written to
+``parity_report.json`` in the output directory.
+
+Usage:
+    python export_models.py [--models Xception "Custom CNN"] [--output-dir exported_models]
+    python export_models.py --tflite float16 int8 --calibration-dir sample_images
+
+Upload the resulting files to the model repo (or ship them in
+NEUROLENS_MODEL_DIR) to have the app pick them up.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from tensorflow.keras.models import load_model
+
+from batch_classify import find_images
+from imaging import load_image_array
+from inference import build_predict_fn
+from models import INFERENCE_FILES, MODEL_DIR, MODEL_FILES, MODEL_INPUT_SIZES, load_training_checkpoint
+from tflite_backend import QUANTIZATIONS, TFLiteModel, convert_model, tflite_filename
+
+
+def export_model(model_key, output_dir, model=None):
+    """Export one model and check the saved artifact reproduces its outputs.
+
+    Args:
+        model_key: Key from ``MODEL_FILES``
+        output_dir: Directory to write the artifact to
+        model: The already loaded model; loaded from the checkpoint if None
+
+    Returns:
+        Path of the written artifact
+    """
+    if model is None:
+        model = load_training_checkpoint(model_key)
+
+    os.makedirs(output_dir, exist_ok=True)
+    artifact_path = os.path.join(output_dir, INFERENCE_FILES[model_key])
+    # The model is never compiled, so no optimizer state ends up in the file
+    model.save(artifact_path)
+
+    # Round-trip check on a random batch
+    h, w = MODEL_INPUT_SIZES[model_key]
+    sample = np.random.default_rng(0).random((2, h, w, 3), dtype=np.float32)
+    exported = load_model(artifact_path, compile=False)
+    max_diff = float(np.max(np.abs(model(sample, training=False) - exported(sample, training=False))))
+    if max_diff > 1e-5:
+        raise RuntimeError(f"Exported {model_key} model deviates from the checkpoint by {max_diff:.2e}")
+
+    return artifact_path
+
+
+def load_images(root, img_size, limit=None):
+    """Preprocess up to ``limit`` images below ``root`` into a (N, H, W, 3) array.
+
+    The images go through ``load_image_array``, i.e. the Analysis page's
+    preprocessing, so int8 calibration and the parity report see the inputs
+    the app serves.
+    """
+    paths = find_images(root)[:limit]
+    if not paths:
+        raise ValueError(f"No images found under {root}")
+    return np.stack([load_image_array(path, img_size) for path in paths])
+
+
+def export_tflite(model_key, model, quantization, output_dir, calibration_images=None):
+    """Convert one model to TFLite and return the path of the written file."""
+    os.makedirs(output_dir, exist_ok=True)
+    tflite_path = os.path.join(output_dir, tflite_filename(model_key, quantization))
+    with open(tflite_path, "wb") as f:
+        f.write(convert_model(model, quantization, calibration_images))
+    return tflite_path
+
+
+def parity_report(model, tflite_model, images, batch_size=8):
+    """Compare a TFLite model with the Keras model it was converted from.
+
+    Args:
+        model: The Keras model
+        tflite_model: A ``TFLiteModel``
+        images: Preprocessed (N, H, W, 3) evaluation images
+        batch_size: Images per forward pass
+
+    Returns:
+        A dict with the class agreement, the max and mean absolute
+        probability deviation, and the per-image latency of both backends
+    """
+    predict_fn = build_predict_fn(model)
+    keras_probs, tflite_probs = [], []
+    keras_seconds = tflite_seconds = 0.0
+    # Warm both backends up so one-off tracing is not timed
+    predict_fn(images[:batch_size])
+    tflite_model.predict(images[:batch_size])
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        t = time.perf_counter()
+        keras_probs.append(predict_fn(batch).numpy())
+        keras_seconds += time.perf_counter() - t
+        t = time.perf_counter()
+        tflite_probs.append(tflite_model.predict(batch))
+        tflite_seconds += time.perf_counter() - t
+
+    keras_probs = np.concatenate(keras_probs)
+    tflite_probs = np.concatenate(tflite_probs)
+    deviation = np.abs(keras_probs - tflite_probs)
+    return {
+        "images": len(images),
+        "class_agreement": float(np.mean(keras_probs.argmax(axis=1) == tflite_probs.argmax(axis=1))),
+        "max_prob_deviation": float(deviation.max()),
+        "mean_prob_deviation": float(deviation.mean()),
+        "keras_ms_per_image": 1000 * keras_seconds / len(images),
+        "tflite_ms_per_image": 1000 * tflite_seconds / len(images),
+        "speedup": keras_seconds / tflite_seconds,
+        "size_bytes": tflite_model.size_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export NeuroLens inference artifacts")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES),
+                        help="Models to export (default: all)")
+    parser.add_argument("--output-dir", default=MODEL_DIR,
+                        help="Directory to write artifacts to (default: %(default)s)")
+    parser.add_argument("--tflite", nargs="*", choices=QUANTIZATIONS, default=None,
+                        help="Also write TFLite variants (no value: all of %(choices)s)")
+    parser.add_argument("--calibration-dir", default="sample_images",
+                        help="Images for int8 calibration (default: %(default)s)")
+    parser.add_argument("--calibration-limit", type=int, default=200,
+                        help="Maximum calibration images per model (default: %(default)s)")
+    parser.add_argument("--parity-dir", default=None,
+                        help="Images for the parity report (default: the calibration images)")
+    args = parser.parse_args()
+    quantizations = [] if args.tflite is None else (args.tflite or list(QUANTIZATIONS))
+
+    report = {}
+    for model_key in args.models:
+        model = load_training_checkpoint(model_key)
+        artifact_path = export_model(model_key, args.output_dir, model)
+        size_mb = os.path.getsize(artifact_path) / (1024 * 1024)
+        print(f"{model_key}: wrote {artifact_path} ({size_mb:.1f} MB)")
+        if not quantizations:
+            continue
+
+        img_size = MODEL_INPUT_SIZES[model_key]
+        calibration_images = load_images(args.calibration_dir, img_size, args.calibration_limit)
+        parity_images = (load_images(args.parity_dir, img_size) if args.parity_dir
+                         else calibration_images)
+        for quantization in quantizations:
+            tflite_path = export_tflite(model_key, model, quantization, args.output_dir, calibration_images)
+            parity = parity_report(model, TFLiteModel(tflite_path), parity_images)
+            report.setdefault(model_key, {})[quantization] = parity
+            print(f"{model_key} {quantization}: wrote {tflite_path} ({parity['size_bytes'] / (1024 * 1024):.1f} MB), "
+                  f"agreement {parity['class_agreement']:.1%}, "
+                  f"max prob deviation {parity['max_prob_deviation']:.4f}, "
+                  f"{parity['keras_ms_per_image']:.1f} -> {parity['tflite_ms_per_image']:.1f} ms/image "
+                  f"({parity['speedup']:.1f}x)")
+
+    if report:
+        report_path = os.path.join(args.output_dir, "parity_report.json")
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Parity report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
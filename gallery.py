@@ -0,0 +1,244 @@
+"""Thumbnail manifest for the sample gallery.
+
+The manifest lists every image under ``sample_images/`` with its class label
+and a pre-sized JPEG thumbnail, so the gallery neither walks the directory
+nor opens full-size scans on each Streamlit rerun, and the browser only
+receives small thumbnails. It is rebuilt when the mtime of the sample
+directory or one of its class folders changes (adding or removing a file
+changes its folder's mtime). Thumbnails of unchanged files are reused from
+the on-disk cache across rebuilds and restarts.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+
+import PIL.Image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Gallery category -> substrings of folder or file names that belong to it
+CATEGORY_KEYWORDS = {
+    "Glioma": ("glioma",),
+    "Meningioma": ("meningioma",),
+    "No Tumor": ("no_tumor", "normal"),
+    "Pituitary": ("pituitary",),
+}
+
+MANIFEST_VERSION = 1
+
+
+def category_of(name):
+    """Return the gallery category a folder or file name belongs to, or None."""
+    name = name.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in name for keyword in keywords):
+            return category
+    return None
+
+
+@dataclass
+class Sample:
+    path: str
+    category: str
+    # Size of the full image
+    width: int
+    height: int
+    # File name of the thumbnail in the cache directory
+    thumbnail_file: str
+    thumbnail_width: int
+    thumbnail_height: int
+
+
+class SampleGallery:
+    """Thumbnail manifest of a sample directory.
+
+    Images are taken from class folders (``sample_images/glioma/...``) and
+    from files directly in ``root`` whose names contain a class keyword.
+
+    Args:
+        root: The sample directory
+        cache_dir: Directory for thumbnails and the manifest
+        thumbnail_size: Longest side of a thumbnail in pixels
+        quality: JPEG quality of the thumbnails
+    """
+
+    def __init__(self, root, cache_dir, thumbnail_size=300, quality=85):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._signature = None
+        self._samples = None
+        self._thumbnails = {}
+        self.builds = 0
+
+    def samples(self):
+        """Return the samples grouped by category, rebuilding the manifest if stale."""
+        with self._lock:
+            if self._samples is None:
+                self._load_manifest()
+            if self._samples is None or self._current_signature(self._signature) != self._signature:
+                self._build()
+            grouped = {category: [] for category in CATEGORY_KEYWORDS}
+            for sample in self._samples:
+                grouped[sample.category].append(sample)
+            return grouped
+
+    def thumbnail(self, sample):
+        """Return the JPEG bytes of a sample's thumbnail."""
+        data = self._thumbnails.get(sample.thumbnail_file)
+        if data is None:
+            with open(os.path.join(self.cache_dir, sample.thumbnail_file), "rb") as f:
+                data = f.read()
+            self._thumbnails[sample.thumbnail_file] = data
+        return data
+
+    def _current_signature(self, previous):
+        # Only the root and the folders seen at the last build are checked; a
+        # new folder changes the mtime of the root
+        directories = list(previous) if previous else [self.root]
+        signature = {}
+        for directory in directories:
+            try:
+                signature[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                signature[directory] = None
+        return signature
+
+    def _scan(self):
+        """Return (path, category) of every sample image and the folders scanned."""
+        images, directories = [], [self.root]
+        if not os.path.isdir(self.root):
+            return images, directories
+        for entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if entry.is_dir():
+                category = category_of(entry.name)
+                if category is None:
+                    continue
+                directories.append(entry.path)
+                for image in sorted(os.scandir(entry.path), key=lambda image: image.name):
+                    if image.is_file() and image.name.lower().endswith(IMAGE_EXTENSIONS):
+                        images.append((image.path, category))
+            elif entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                category = category_of(entry.name)
+                if category is not None:
+                    images.append((entry.path, category))
+        return images, directories
+
+    def _build(self):
+        images, directories = self._scan()
+        # Signature first: a file added while building triggers another build
+        signature = self._current_signature(directories)
+        previous = {sample.thumbnail_file: sample for sample in self._samples or []}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        samples = []
+        for path, category in images:
+            try:
+                thumbnail_file = self._thumbnail_name(path)
+            except OSError:
+                continue
+            sample = previous.get(thumbnail_file)
+            if sample is None or not os.path.exists(os.path.join(self.cache_dir, thumbnail_file)):
+                try:
+                    sample = self._make_thumbnail(path, category, thumbnail_file)
+                except (OSError, ValueError):
+                    # Unreadable image - leave it out of the gallery
+                    continue
+            else:
+                sample = Sample(**{**asdict(sample), "path": path, "category": category})
+            samples.append(sample)
+
+        # Drop thumbnails of files that are gone
+        referenced = {sample.thumbnail_file for sample in samples}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".jpg") and name not in referenced:
+                self._thumbnails.pop(name, None)
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+        self._samples = samples
+        self._signature = signature
+        self.builds += 1
+        self._write_manifest()
+
+    def _thumbnail_name(self, path):
+        stat = os.stat(path)
+        fingerprint = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.thumbnail_size}:{self.quality}"
+        return hashlib.sha256(fingerprint.encode()).hexdigest()[:32] + ".jpg"
+
+    def _make_thumbnail(self, path, category, thumbnail_file):
+        with PIL.Image.open(path) as img:
+            width, height = img.size
+            # draft() lets JPEG decoding skip straight to a reduced scale
+            img.draft("RGB", (self.thumbnail_size, self.thumbnail_size))
+            img = img.convert("RGB")
+            img.thumbnail((self.thumbnail_size, self.thumbnail_size), PIL.Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=self.quality)
+
+        data = buffer.getvalue()
+        _write_atomic(os.path.join(self.cache_dir, thumbnail_file), data)
+        self._thumbnails[thumbnail_file] = data
+        return Sample(path, category, width, height, thumbnail_file, img.width, img.height)
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, "manifest.json")
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+            if (manifest["version"] != MANIFEST_VERSION or manifest["root"] != os.path.abspath(self.root)
+                    or manifest["thumbnail_size"] != self.thumbnail_size):
+                return
+            self._samples = [Sample(**sample) for sample in manifest["samples"]]
+            self._signature = manifest["signature"]
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or unreadable manifest - it is rebuilt
+            self._samples = None
+
+    def _write_manifest(self):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "root": os.path.abspath(self.root),
+            "thumbnail_size": self.thumbnail_size,
+            "signature": self._signature,
+            "samples": [asdict(sample) for sample in self._samples],
+        }
+        _write_atomic(self._manifest_path(), json.dumps(manifest).encode())
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_gallery = None
+_gallery_lock = threading.Lock()
+
+
+def get_gallery():
+    """Return the process-wide gallery of ``sample_images/``.
+
+    Thumbnails are cached in ``NEUROLENS_THUMBNAIL_DIR`` (default
+    ``thumbnail_cache``).
+    """
+    global _gallery
+    if _gallery is None:
+        with _gallery_lock:
+            if _gallery is None:
+                _gallery = SampleGallery(
+                    "sample_images",
+                    os.environ.get("NEUROLENS_THUMBNAIL_DIR", "thumbnail_cache"),
+                )
+    return _gallery
@@ -0,0 +1,187 @@
+"""Persistent history of analyses in SQLite.
+
+Every analysis shown on the Analysis page is recorded with its time, file
+name, image hash, model, backend, prediction, probabilities and the keys
+needed to re-open it without recomputation: the result cache key and the
+paths of any saved saliency map and report. Timestamp, model, predicted
+class and image hash are indexed, so the History page can page through and
+aggregate months of analyses cheaply.
+
+The database lives at ``NEUROLENS_HISTORY_DB`` (default ``history.db``);
+it is opened in WAL mode so several app processes can share it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import get_metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    filename TEXT,
+    image_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    backend TEXT,
+    prediction TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    probabilities TEXT NOT NULL,
+    explanation TEXT,
+    result_key TEXT,
+    saliency_map_path TEXT,
+    report_path TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_created_at ON analyses (created_at);
+CREATE INDEX IF NOT EXISTS analyses_model ON analyses (model, created_at);
+CREATE INDEX IF NOT EXISTS analyses_prediction ON analyses (prediction, created_at);
+CREATE INDEX IF NOT EXISTS analyses_image_hash ON analyses (image_hash);
+"""
+
+# Columns ``counts`` can group by, with the SQL expression for each
+GROUPS = {
+    "prediction": "prediction",
+    "model": "model",
+    "backend": "backend",
+    "day": "date(created_at, 'unixepoch', 'localtime')",
+}
+
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _where(model=None, prediction=None, image_hash=None, since=None, until=None):
+    """SQL condition and parameters for the common filters."""
+    clauses, params = [], []
+    for column, value in (("model", model), ("prediction", prediction), ("image_hash", image_hash)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class HistoryStore:
+    """SQLite-backed analysis history, safe to share between threads.
+
+    Args:
+        path: Database file (``:memory:`` for a throwaway store)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def record(self, image_bytes, filename, model, backend, prediction, confidence, probabilities,
+               explanation=None, result_key=None, saliency_map_path=None, report_path=None, created_at=None):
+        """Store one analysis and return its id.
+
+        Args:
+            image_bytes: The analysed image, hashed to find repeat scans
+            probabilities: Per-class probabilities, in ``LABELS`` order
+            explanation: The Gemini explanation, if one was generated
+            result_key: Key of the result in the result cache
+        """
+        row = (
+            time.time() if created_at is None else created_at,
+            filename,
+            image_hash(image_bytes),
+            model,
+            backend,
+            prediction,
+            float(confidence),
+            json.dumps([float(p) for p in probabilities]),
+            explanation,
+            result_key,
+            saliency_map_path,
+            report_path,
+        )
+        with get_metrics().span("history_write"), self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO analyses (created_at, filename, image_hash, model, backend, prediction, confidence,"
+                " probabilities, explanation, result_key, saliency_map_path, report_path)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+        return cursor.lastrowid
+
+    def query(self, limit=20, offset=0, **filters):
+        """Return analyses matching ``filters``, newest first.
+
+        Args:
+            limit: Page size
+            offset: Number of matching analyses to skip
+            **filters: Any of ``model``, ``prediction``, ``image_hash`` and
+                ``since`` / ``until`` (epoch seconds, until exclusive)
+        """
+        where, params = _where(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM analyses{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [_to_dict(row) for row in rows]
+
+    def count(self, **filters):
+        where, params = _where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def counts(self, group_by="prediction", **filters):
+        """Return the number of matching analyses per ``group_by`` value.
+
+        Args:
+            group_by: One of ``GROUPS``
+            **filters: As for ``query``
+        """
+        expression = GROUPS[group_by]
+        where, params = _where(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {expression} AS value, COUNT(*) FROM analyses{where} GROUP BY value ORDER BY value",
+                params,
+            ).fetchall()
+        return {value: count for value, count in rows}
+
+    def get(self, analysis_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        return None if row is None else _to_dict(row)
+
+    def stats(self):
+        return {"analyses": self.count()}
+
+
+def _to_dict(row):
+    analysis = dict(row)
+    analysis["probabilities"] = json.loads(analysis["probabilities"])
+    return analysis
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store (``NEUROLENS_HISTORY_DB``)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(os.environ.get("NEUROLENS_HISTORY_DB", "history.db"))
+    return _store
@@ -0,0 +1,121 @@
+"""In-memory image decoding and preprocessing.
+
+An upload is decoded once into an RGB array and that array is handed from
+stage to stage (model input, saliency overlay, report); nothing is written
+to disk unless a caller explicitly asks for it.
+"""
+import io
+import os
+from datetime import datetime
+
+import numpy as np
+import PIL.Image
+
+# Larger uploads are downscaled to this width or height on decode, before
+# they are resized to a model input
+MAX_DIMENSION = 800
+
+
+def read_image_bytes(file_input):
+    """Return the raw bytes and a display name for any supported input.
+
+    Args:
+        file_input: Can be a path string, raw bytes, BytesIO object, or a
+            file-like object (e.g., from st.file_uploader)
+    """
+    # Get the original filename if available
+    if hasattr(file_input, 'name'):
+        original_filename = os.path.basename(file_input.name)
+    else:
+        original_filename = f"image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+
+    if isinstance(file_input, (bytes, bytearray)):
+        return bytes(file_input), original_filename
+    if isinstance(file_input, str):
+        # It's a file path
+        with open(file_input, 'rb') as f:
+            return f.read(), os.path.basename(file_input)
+    if hasattr(file_input, 'getvalue'):
+        # UploadedFile from streamlit, or BytesIO
+        return file_input.getvalue(), original_filename
+    if hasattr(file_input, 'read'):
+        # BufferedReader or similar
+        data = file_input.read()
+        # Seek back to start for potential reuse
+        if hasattr(file_input, 'seek'):
+            file_input.seek(0)
+        return data, original_filename
+    raise TypeError(f"Unsupported file input type: {type(file_input)}")
+
+
+def decode_image(image_bytes, max_dimension=None):
+    """Decode encoded image bytes into an RGB uint8 array.
+
+    Args:
+        image_bytes: Encoded image (JPEG, PNG, ...)
+        max_dimension: If set, larger images are downscaled to fit, keeping
+            the aspect ratio
+    """
+    with PIL.Image.open(io.BytesIO(image_bytes)) as img:
+        img = img.convert("RGB")
+        w, h = img.size
+        if max_dimension and max(w, h) > max_dimension:
+            # Calculate new dimensions while maintaining aspect ratio
+            if w > h:
+                new_w = max_dimension
+                new_h = int(h * (max_dimension / w))
+            else:
+                new_h = max_dimension
+                new_w = int(w * (max_dimension / h))
+            img = img.resize((new_w, new_h), PIL.Image.LANCZOS)
+        return np.asarray(img)
+
+
+def process_image_input(file_input, max_dimension=MAX_DIMENSION):
+    """Read and decode an image input once, entirely in memory.
+
+    Args:
+        file_input: Anything ``read_image_bytes`` accepts
+        max_dimension: Maximum width or height of the decoded image
+
+    Returns:
+        A tuple of (image_bytes, rgb_array, original_file_name)
+    """
+    image_bytes, original_filename = read_image_bytes(file_input)
+    return image_bytes, decode_image(image_bytes, max_dimension), original_filename
+
+
+def preprocess(rgb_array, img_size):
+    """Resize a decoded image to a model input scaled to [0, 1].
+
+    Matches keras' load_img + img_to_array / 255: nearest-neighbour resize.
+
+    Args:
+        rgb_array: RGB uint8 array of any size
+        img_size: Model input size (height, width)
+
+    Returns:
+        A float32 array of shape (H, W, 3)
+    """
+    img = PIL.Image.fromarray(rgb_array)
+    if img.size != (img_size[1], img_size[0]):
+        img = img.resize((img_size[1], img_size[0]), PIL.Image.NEAREST)
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def load_image_array(source, img_size):
+    """Decode an image straight into a model input.
+
+    The input is exactly the one the Analysis page builds from the same
+    image: ``process_image_input``'s downscale to ``MAX_DIMENSION``, then
+    ``preprocess``.
+
+    Args:
+        source: A file path, raw encoded bytes or a file-like object
+        img_size: Model input size (height, width)
+
+    Returns:
+        A float32 array of shape (H, W, 3) scaled to [0, 1]
+    """
+    image_bytes, _ = read_image_bytes(source)
+    return preprocess(decode_image(image_bytes, MAX_DIMENSION), img_size)
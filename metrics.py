@@ -0,0 +1,223 @@
+"""Process-wide timing spans and counters with a Prometheus text exposition.
+
+Hot-path stages (model resolution and loading, preprocessing, prediction,
+saliency, the Gemini call, report rendering, artifact writes) are timed with
+``span()`` and aggregated into a histogram per stage and model, so a slow
+analysis can be attributed to the model, the disk or the LLM from a live
+process. ``render()`` produces the Prometheus text format served on
+``/metrics`` by the health server (``NEUROLENS_HEALTH_PORT``) and by
+``serve.py``.
+
+This module only depends on the standard library so that any other module
+can be instrumented without import cycles.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = "neurolens_stage_seconds"
+ERRORS = "neurolens_errors_total"
+REQUESTS = "neurolens_analyses_total"
+CACHED = "neurolens_cached_analyses_total"
+IN_FLIGHT = "neurolens_analyses_in_flight"
+
+HELP = {
+    STAGE_SECONDS: "Time spent per pipeline stage",
+    ERRORS: "Failed pipeline stages",
+    REQUESTS: "Analyses computed per model",
+    CACHED: "Analyses served from the result cache or the sample bundle per model",
+    IN_FLIGHT: "Analyses currently running",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms keyed by name and labels.
+
+    Args:
+        buckets: Histogram bucket upper bounds in seconds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = defaultdict(float)
+        # (name, labels) -> [bucket counts..., sum, count, max]
+        self._histograms = {}
+        # prefix -> (stats function, label field)
+        self._stats_sources = {}
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[name, _label_key(labels)] += value
+
+    def add_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[name, _label_key(labels)] += value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-3] += seconds
+            histogram[-2] += 1
+            histogram[-1] = max(histogram[-1], seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Time the enclosed block as ``stage``; exceptions are counted and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(ERRORS, stage=stage, **labels)
+            raise
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage, **labels)
+
+    @contextmanager
+    def analysis(self, model):
+        """Count one end-to-end analysis with ``model`` and track it as in flight.
+
+        Yields a dict whose ``"cached"`` the caller sets to True when the
+        result came from a cache. Such an analysis, e.g. a Streamlit rerun,
+        is only counted in ``CACHED``, so it neither inflates ``REQUESTS``
+        nor pulls the analysis latency towards zero.
+        """
+        outcome = {"cached": False}
+        self.add_gauge(IN_FLIGHT, 1)
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            self.inc(ERRORS, stage="analysis", model=model)
+            raise
+        finally:
+            self.add_gauge(IN_FLIGHT, -1)
+            if outcome["cached"]:
+                self.inc(CACHED, model=model)
+            else:
+                self.inc(REQUESTS, model=model)
+                self.observe(STAGE_SECONDS, time.perf_counter() - start, stage="analysis", model=model)
+
+    def register_stats(self, prefix, stats_fn, label=None):
+        """Export the numeric fields of ``stats_fn()`` as gauges on every render.
+
+        ``stats_fn`` returns a dict, or a list of dicts labelled by their
+        ``label`` field (e.g. ``ModelRegistry.stats``). Registering the same
+        prefix again replaces the source.
+        """
+        with self._lock:
+            self._stats_sources[prefix] = (stats_fn, label)
+
+    def _stats_samples(self):
+        with self._lock:
+            sources = list(self._stats_sources.items())
+        samples = []
+        for prefix, (stats_fn, label) in sources:
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            rows = stats if isinstance(stats, list) else [stats]
+            for row in rows:
+                labels = _label_key({label: row.get(label)}) if label else ()
+                for field, value in row.items():
+                    if field != label and isinstance(value, (int, float)) and not isinstance(value, bool):
+                        samples.append((f"neurolens_{prefix}_{field}", labels, value))
+        return samples
+
+    def stage_summary(self):
+        """Return count, mean and max milliseconds per (stage, labels) for display."""
+        with self._lock:
+            histograms = [(key, list(values)) for key, values in self._histograms.items()
+                          if key[0] == STAGE_SECONDS]
+            errors = {labels: value for (name, labels), value in self._counters.items() if name == ERRORS}
+        rows = []
+        for (_, labels), histogram in sorted(histograms):
+            total, count, maximum = histogram[-3:]
+            row = dict(labels)
+            row.update({
+                "count": count,
+                "mean_ms": 1000 * total / count if count else 0.0,
+                "max_ms": 1000 * maximum,
+                "errors": int(errors.get(labels, 0)),
+            })
+            rows.append(row)
+        return rows
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name, metric_type):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in gauges:
+            describe(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), histogram in histograms:
+            describe(name, "histogram")
+            for bound, bucket_count in zip(self.buckets, histogram):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram[-2]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram[-3])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram[-2]}")
+        # Samples of one metric must be contiguous
+        for name, labels, value in sorted(self._stats_samples(), key=lambda sample: sample[0]):
+            describe(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide metrics."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
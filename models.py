@@ -0,0 +1,345 @@
+"""Model loading and the process-wide model registry.
+
+Streamlit re-executes ``app.py`` on every interaction, but modules imported by
+it are only imported once per process. Models held by the registry below are
+therefore loaded once and shared by every session served by the process.
+
+TensorFlow is imported by the functions that need it, so the constants and
+the registry can be imported without paying for it.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from huggingface_hub import hf_hub_download
+
+from metrics import get_metrics
+
+MODEL_REPO = "Pranavch/neurolens-brain-tumor-model"
+
+MODEL_FILES = {
+    "Xception": "xception_model.weights.h5",        # or .weights.h5 if that’s what you uploaded
+    "Custom CNN": "cnn_model.h5",
+}
+
+# Self-contained inference artifacts produced by export_models.py: the full
+# graph plus weights, without optimizer state. They (and the TFLite variants,
+# see tflite_backend.py) are looked up in NEUROLENS_MODEL_DIR first and then
+# in MODEL_REPO.
+INFERENCE_FILES = {
+    "Xception": "xception_inference.keras",
+    "Custom CNN": "cnn_inference.keras",
+}
+
+MODEL_DIR = os.environ.get("NEUROLENS_MODEL_DIR", "exported_models")
+
+# Input resolution (height, width) each model was trained on
+MODEL_INPUT_SIZES = {
+    "Xception": (299, 299),
+    "Custom CNN": (224, 224),
+}
+
+# Class labels in the order of the models' softmax outputs
+LABELS = ['Glioma', 'Meningioma', 'No Tumor', 'Pituitary']
+
+# Name of the weighted combination of every model in MODEL_FILES, see ensemble.py
+ENSEMBLE = "Ensemble"
+
+
+def get_model_path(model_key):
+    with get_metrics().span("resolve", file=MODEL_FILES[model_key]):
+        return hf_hub_download(
+            repo_id=MODEL_REPO,
+            filename=MODEL_FILES[model_key],
+            token=False  # Public repo, no auth needed
+        )
+
+
+def build_xception_model():
+    """Build the Xception classifier graph with uninitialised weights.
+
+    The ImageNet weights are deliberately not fetched: every layer is
+    overwritten by the fine-tuned checkpoint right after.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Flatten, Dropout
+
+    img_shape = (299, 299, 3)
+    base_model = tf.keras.applications.Xception(
+        include_top=False,
+        weights=None,
+        input_shape=img_shape,
+        pooling='max'
+    )
+
+    model = Sequential([
+        base_model,
+        Flatten(),
+        Dropout(rate=0.3),
+        Dense(128, activation='relu'),
+        Dropout(rate=0.25),
+        Dense(4, activation='softmax')
+    ])
+
+    model.build((None,) + img_shape)
+    return model
+
+
+def load_xception_model(model_path):
+    model = build_xception_model()
+    model.load_weights(model_path)
+    return model
+
+
+def _build_from_checkpoint(model_key, model_path):
+    from tensorflow.keras.models import load_model
+
+    if model_key == "Xception":
+        return load_xception_model(model_path)
+    return load_model(model_path, compile=False)
+
+
+def load_training_checkpoint(model_key):
+    """Build a model from the original training checkpoint in ``MODEL_REPO``."""
+    return _build_from_checkpoint(model_key, get_model_path(model_key))
+
+
+def file_version(path):
+    """Short identifier that changes whenever the model file changes.
+
+    It is a hash of the file content, so the same weights get the same
+    version on every host; results computed at build time (see
+    sample_bundle.py) stay valid wherever the file is deployed. Hashing
+    takes about 0.1 s per 100 MB, paid once per model load.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def find_artifact(filename):
+    """Return a local path to an exported artifact, or None.
+
+    ``NEUROLENS_MODEL_DIR`` is checked first, then ``MODEL_REPO``.
+    """
+    local_path = os.path.join(MODEL_DIR, filename)
+    if os.path.isfile(local_path):
+        return local_path
+    try:
+        with get_metrics().span("resolve", file=filename):
+            return hf_hub_download(repo_id=MODEL_REPO, filename=filename, token=False)
+    except Exception:
+        # Not published, or no network and not cached
+        return None
+
+
+def find_inference_artifact(model_key):
+    """Return a local path to the exported inference artifact, or None."""
+    return find_artifact(INFERENCE_FILES[model_key])
+
+
+def load_model_for_key(model_key):
+    """Load a model ready for inference.
+
+    Prefers the self-contained artifact written by ``export_models.py`` and
+    falls back to rebuilding the graph from the training checkpoint. Models
+    are never compiled: inference needs no optimizer, loss or metrics.
+
+    Returns:
+        A tuple of (model, version) where version identifies the weights file
+
+    Raises:
+        KeyError: If ``model_key`` is not one of ``MODEL_FILES``.
+    """
+    from tensorflow.keras.models import load_model
+
+    if model_key not in MODEL_FILES:
+        raise KeyError(f"Unknown model: {model_key}")
+
+    artifact_path = find_inference_artifact(model_key)
+    if artifact_path is not None:
+        return load_model(artifact_path, compile=False), file_version(artifact_path)
+
+    model_path = get_model_path(model_key)
+    return _build_from_checkpoint(model_key, model_path), file_version(model_path)
+
+
+def model_size_bytes(model):
+    """Approximate resident size of a model as the total size of its weights."""
+    import tensorflow as tf
+
+    total = 0
+    for weight in model.weights:
+        count = 1
+        for dim in weight.shape:
+            count *= int(dim)
+        total += count * tf.as_dtype(weight.dtype).size
+    return total
+
+
+@dataclass
+class ModelEntry:
+    key: str
+    model: object
+    # Identifies the loaded weights, e.g. to key cached results
+    version: str
+    # Fused predict-and-gradient tf.function, see inference.build_inference_fn
+    inference_fn: object
+    # Forward-only tf.function, see inference.build_predict_fn
+    predict_fn: object
+    # Predict-and-class-activation-map tf.function (None without conv
+    # layers), see inference.build_gradcam_fn
+    gradcam_fn: object
+    # Saliency of every class from one forward pass: input gradients, see
+    # inference.build_class_saliency_fn, and class activation maps (None
+    # without conv layers), see inference.build_gradcam_fn
+    class_saliency_fn: object
+    class_gradcam_fn: object
+    img_size: tuple
+    load_seconds: float
+    size_bytes: int
+    loaded_at: float
+    hits: int = 0
+
+
+class ModelRegistry:
+    """Thread-safe, LRU-bounded cache of loaded models keyed by ``MODEL_FILES``.
+
+    Args:
+        loader: Callable returning a (model, version) tuple for a key
+        max_models: Maximum number of models kept resident (None for no limit)
+        max_bytes: Maximum total weight size kept resident (None for no limit)
+    """
+
+    def __init__(self, loader=load_model_for_key, max_models=None, max_bytes=None):
+        self._loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key so a slow load does not block lookups of other models
+        self._key_locks = {}
+        self.evictions = 0
+
+    def get(self, model_key):
+        """Return the ``ModelEntry`` for ``model_key``, loading it on first use."""
+        from inference import (build_class_saliency_fn, build_gradcam_fn, build_gradcam_model, build_inference_fn,
+                               build_predict_fn)
+
+        with self._lock:
+            entry = self._touch(model_key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(model_key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._touch(model_key)
+                if entry is not None:
+                    return entry
+
+            start = time.perf_counter()
+            with get_metrics().span("load", model=model_key):
+                model, version = self._loader(model_key)
+            # Shared by the single-class and all-class Grad-CAM functions
+            gradcam_model = build_gradcam_model(model)
+            entry = ModelEntry(
+                key=model_key,
+                model=model,
+                version=version,
+                inference_fn=build_inference_fn(model),
+                predict_fn=build_predict_fn(model),
+                gradcam_fn=build_gradcam_fn(gradcam_model),
+                class_saliency_fn=build_class_saliency_fn(model),
+                class_gradcam_fn=build_gradcam_fn(gradcam_model, all_classes=True),
+                img_size=MODEL_INPUT_SIZES.get(model_key, tuple(model.input_shape[1:3])),
+                load_seconds=time.perf_counter() - start,
+                size_bytes=model_size_bytes(model),
+                loaded_at=time.time(),
+            )
+
+            with self._lock:
+                self._entries[model_key] = entry
+                self._evict_over_budget()
+        return entry
+
+    def _touch(self, model_key):
+        entry = self._entries.get(model_key)
+        if entry is not None:
+            self._entries.move_to_end(model_key)
+            entry.hits += 1
+        return entry
+
+    def _evict_over_budget(self):
+        # Never evict the most recently used model, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            (self.max_models is not None and len(self._entries) > self.max_models)
+            or (self.max_bytes is not None and self.resident_bytes() > self.max_bytes)
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def resident_bytes(self):
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def is_loaded(self, model_key):
+        with self._lock:
+            return model_key in self._entries
+
+    def evict(self, model_key):
+        with self._lock:
+            if self._entries.pop(model_key, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return per-model load time, resident size and hit counts."""
+        with self._lock:
+            return [
+                {
+                    "model": entry.key,
+                    "version": entry.version,
+                    "load_seconds": entry.load_seconds,
+                    "size_bytes": entry.size_bytes,
+                    "loaded_at": entry.loaded_at,
+                    "hits": entry.hits,
+                }
+                for entry in self._entries.values()
+            ]
+
+
+def _env_number(name, cast):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide model registry.
+
+    The cap can be tuned with ``NEUROLENS_MAX_MODELS`` and
+    ``NEUROLENS_MAX_MODEL_MB``.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                max_mb = _env_number("NEUROLENS_MAX_MODEL_MB", float)
+                _registry = ModelRegistry(
+                    max_models=_env_number("NEUROLENS_MAX_MODELS", int),
+                    max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+                )
+    return _registry
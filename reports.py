@@ -0,0 +1,359 @@
+"""Self-contained HTML analysis reports, built in memory.
+
+Images are inlined as base64 data URIs. Arrays are encoded once in
+``NEUROLENS_REPORT_IMAGE_FORMAT`` (``jpeg`` by default, or ``webp`` /
+``png``) at ``NEUROLENS_REPORT_IMAGE_QUALITY``; already-encoded images such
+as the uploaded scan are inlined as they are. The page layout is a template
+compiled once at import, so a report costs the image encodings and one
+substitution. ``report_payload`` optionally gzips the result
+(``NEUROLENS_REPORT_GZIP``) for download.
+"""
+import base64
+import gzip
+import html
+import io
+import os
+from datetime import datetime
+from string import Template
+
+import numpy as np
+import PIL.Image
+
+from segmentation import segmentation_overlay
+
+IMAGE_FORMATS = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+REPORT_IMAGE_FORMAT = os.environ.get("NEUROLENS_REPORT_IMAGE_FORMAT", "jpeg").lower()
+REPORT_IMAGE_QUALITY = int(os.environ.get("NEUROLENS_REPORT_IMAGE_QUALITY", 85))
+REPORT_GZIP = os.environ.get("NEUROLENS_REPORT_GZIP", "").lower() in ("1", "true", "yes")
+
+# Encoded uploads larger than this are re-encoded instead of inlined
+MAX_INLINE_BYTES = 1024 * 1024
+
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+
+def sniff_mime(data):
+    """Return the MIME type of encoded JPEG, PNG or WebP bytes, or None."""
+    for magic, mime in _MAGIC:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def can_inline(data):
+    """Whether encoded image bytes can go into a report as they are."""
+    return sniff_mime(data) is not None and len(data) <= MAX_INLINE_BYTES
+
+
+def encode_image(img, image_format=None, quality=None):
+    """Encode an image for a report.
+
+    Args:
+        img: RGB array, PIL image, or already-encoded bytes (kept as they are)
+        image_format: One of ``IMAGE_FORMATS`` (default
+            ``REPORT_IMAGE_FORMAT``)
+        quality: JPEG/WebP quality (default ``REPORT_IMAGE_QUALITY``);
+            ignored for PNG
+
+    Returns:
+        A tuple of (encoded bytes, MIME type)
+    """
+    if isinstance(img, (bytes, bytearray)):
+        return bytes(img), sniff_mime(img)
+
+    image_format = (image_format or REPORT_IMAGE_FORMAT).lower()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported report image format: {image_format}")
+    if isinstance(img, np.ndarray):
+        img = PIL.Image.fromarray(img.astype('uint8'))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buffer = io.BytesIO()
+    if image_format == "png":
+        img.save(buffer, format="PNG")
+    else:
+        img.save(buffer, format=image_format.upper(), quality=quality or REPORT_IMAGE_QUALITY)
+    return buffer.getvalue(), IMAGE_FORMATS[image_format]
+
+
+def _data_uri(img, image_format, quality):
+    data, mime = encode_image(img, image_format, quality)
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+_TEMPLATE = Template('''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>NeuroLens Brain Tumor Analysis Report</title>
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f9f9f9;
+        }
+        .report-container {
+            background-color: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+            padding: 30px;
+            margin-bottom: 30px;
+        }
+        .header {
+            text-align: center;
+            margin-bottom: 30px;
+            padding-bottom: 20px;
+            border-bottom: 1px solid #eee;
+        }
+        .header h1 {
+            color: #2c3e50;
+            margin-bottom: 10px;
+            font-size: 28px;
+        }
+        .timestamp {
+            color: #7f8c8d;
+            font-size: 14px;
+            margin-top: 10px;
+        }
+        .images-container {
+            display: flex;
+            justify-content: space-between;
+            margin-bottom: 30px;
+            flex-wrap: wrap;
+        }
+        .image-box {
+            width: 48%;
+            margin-bottom: 20px;
+            border-radius: 6px;
+            overflow: hidden;
+            box-shadow: 0 1px 5px rgba(0,0,0,0.1);
+        }
+        .image-box h3 {
+            background-color: #2c3e50;
+            color: white;
+            margin: 0;
+            padding: 10px 15px;
+            font-size: 16px;
+        }
+        .image-box img {
+            width: 100%;
+            height: auto;
+            display: block;
+        }
+        .results-container {
+            background-color: #f8f9fa;
+            border-radius: 6px;
+            padding: 25px;
+            margin-bottom: 30px;
+        }
+        .prediction {
+            font-size: 24px;
+            color: #FF5722;
+            margin-bottom: 10px;
+            font-weight: bold;
+        }
+        .prediction.no-tumor {
+            color: #4CAF50;
+        }
+        .confidence {
+            font-size: 18px;
+            color: #34495e;
+            margin-bottom: 20px;
+        }
+        .explanation-container {
+            background-color: #fff;
+            border-left: 4px solid #3498db;
+            padding: 20px;
+            margin-bottom: 30px;
+            border-radius: 0 6px 6px 0;
+        }
+        .explanation-container h3 {
+            color: #2c3e50;
+            margin-top: 0;
+        }
+        .explanation-text {
+            font-size: 16px;
+            line-height: 1.7;
+            color: #34495e;
+        }
+        .regions {
+            border-collapse: collapse;
+            width: 100%;
+            margin: 10px 0;
+        }
+        .regions th, .regions td {
+            border-bottom: 1px solid #eee;
+            padding: 6px 10px;
+            text-align: left;
+        }
+        .note {
+            font-size: 12px;
+            color: #7f8c8d;
+        }
+        .disclaimer {
+            font-size: 12px;
+            color: #7f8c8d;
+            font-style: italic;
+            padding: 15px;
+            background-color: #f8f9fa;
+            border-radius: 6px;
+            margin-top: 30px;
+        }
+        @media (max-width: 768px) {
+            .image-box {
+                width: 100%;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="report-container">
+        <div class="header">
+            <h1>NeuroLens Brain Tumor Analysis Report</h1>
+            <div class="timestamp">Generated on: $timestamp</div>
+        </div>
+
+        <div class="images-container">
+            <div class="image-box">
+                <h3>Original MRI Scan</h3>
+                <img src="$original_uri" alt="Original MRI Scan">
+            </div>
+            <div class="image-box">
+                <h3>Saliency Map Analysis</h3>
+                <img src="$saliency_uri" alt="Saliency Map">
+            </div>
+        </div>
+
+        <div class="results-container">
+            <h2>Analysis Results</h2>
+            <div class="$prediction_class">Diagnosis: $prediction</div>
+            <div class="confidence">Confidence: $confidence</div>
+        </div>
+        $segmentation_section
+        <div class="explanation-container">
+            <h3>Expert Analysis</h3>
+            <div class="explanation-text">
+                $explanation
+            </div>
+        </div>
+
+        <div class="disclaimer">
+            <strong>Disclaimer:</strong> This analysis is generated by an AI model and should be reviewed by a healthcare professional.
+            NeuroLens is designed as a research and assistive tool and is not intended to replace professional medical diagnosis or advice.
+        </div>
+    </div>
+</body>
+</html>
+''')
+
+_NO_REGIONS_SECTION = '''
+        <div class="results-container">
+            <h2>Tumor Segmentation</h2>
+            <p>No region above the size threshold was found in the salient area.</p>
+        </div>
+'''
+
+_SEGMENTATION_TEMPLATE = Template('''
+        <div class="results-container">
+            <h2>Tumor Segmentation</h2>
+            <div class="images-container">
+                <div class="image-box">
+                    <h3>Segmented Regions</h3>
+                    <img src="$overlay_uri" alt="Segmented Regions">
+                </div>
+                <div class="image-box">
+                    <p>Segmented area: $area mm² in $count region(s), equivalent diameter $diameter mm.</p>
+                    <table class="regions">
+                        <tr><th>Region</th><th>Area (mm²)</th><th>Diameter (mm)</th></tr>
+                        $rows
+                    </table>
+                    <p class="note">Threshold-based estimate on a simulated scale; not a clinical measurement.</p>
+                </div>
+            </div>
+        </div>
+''')
+
+
+def _segmentation_section(segmentation_img, segmentation, image_format, quality):
+    """HTML for the segmentation results, or an empty string."""
+    if segmentation is None:
+        return ""
+    if not segmentation.regions:
+        return _NO_REGIONS_SECTION
+    rows = "".join(
+        f"<tr><td>{i + 1}</td><td>{region.area_mm2:.2f}</td><td>{region.diameter_mm:.2f}</td></tr>"
+        for i, region in enumerate(segmentation.regions)
+    )
+    overlay = segmentation_overlay(np.asarray(segmentation_img), segmentation.mask)
+    return _SEGMENTATION_TEMPLATE.substitute(
+        overlay_uri=_data_uri(overlay, image_format, quality),
+        area=f"{segmentation.area_mm2:.2f}",
+        count=len(segmentation.regions),
+        diameter=f"{segmentation.diameter_mm:.2f}",
+        rows=rows,
+    )
+
+
+def generate_report(original_img, saliency_map, prediction, confidence, explanation, segmentation=None,
+                    segmentation_img=None, image_format=None, quality=None):
+    """Generate a clean and readable HTML report for the brain tumor analysis.
+
+    Args:
+        original_img: The original MRI image, as an array or as encoded bytes
+            (see ``can_inline``)
+        saliency_map: The generated saliency map highlighting areas of interest
+        prediction: The model's prediction (tumor type)
+        confidence: The confidence score of the prediction
+        explanation: The AI-generated explanation of the findings
+        segmentation: Optional ``segmentation.Segmentation`` of the scan
+        segmentation_img: The array ``segmentation`` was computed on;
+            required with ``segmentation``, since ``original_img`` may be
+            encoded bytes
+        image_format: Format of the encoded images (default
+            ``REPORT_IMAGE_FORMAT``)
+        quality: JPEG/WebP quality (default ``REPORT_IMAGE_QUALITY``)
+
+    Returns:
+        HTML string representing the formatted report
+    """
+    if segmentation is not None and segmentation_img is None:
+        raise ValueError("segmentation_img is required with segmentation")
+
+    return _TEMPLATE.substitute(
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        original_uri=_data_uri(original_img, image_format, quality),
+        saliency_uri=_data_uri(saliency_map, image_format, quality),
+        prediction_class="prediction no-tumor" if prediction == "No Tumor" else "prediction",
+        prediction=html.escape(prediction),
+        confidence=f"{confidence:.2%}",
+        segmentation_section=_segmentation_section(segmentation_img, segmentation, image_format, quality),
+        explanation=html.escape(explanation),
+    )
+
+
+def report_payload(report_html, filename, compress=None):
+    """Return the bytes, file name and MIME type to offer a report for download.
+
+    Args:
+        report_html: Report from ``generate_report``
+        filename: File name of the uncompressed report
+        compress: Gzip the report (default ``REPORT_GZIP``)
+    """
+    data = report_html.encode()
+    if REPORT_GZIP if compress is None else compress:
+        # mtime=0 makes the bytes depend on the HTML alone. Reports still
+        # differ by their "Generated on" timestamp, so they do not dedupe
+        return gzip.compress(data, compresslevel=6, mtime=0), filename + ".gz", "application/gzip"
+    return data, filename, "text/html"
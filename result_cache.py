@@ -0,0 +1,224 @@
+"""Content-addressed cache of finished analyses.
+
+Results are keyed by a hash of the image bytes, the model key and the model
+version, so re-uploading the same scan (or Streamlit re-running the page)
+returns the stored probabilities, saliency overlay, explanation and report
+instead of recomputing them. An in-memory LRU tier serves the process; an
+optional on-disk tier is shared across sessions, workers and restarts. Like
+the artifact store, the disk tier has a size budget and a maximum age,
+enforced by the same ``BoundedDirectory``.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from artifacts import BoundedDirectory, touch
+
+
+def result_key(image_bytes, model_key, model_version, variant=""):
+    """Cache key for one analysis of ``image_bytes``.
+
+    Args:
+        image_bytes: The encoded image exactly as analysed
+        model_key: Key from ``MODEL_FILES``
+        model_version: ``ModelEntry.version`` of the model used
+        variant: Anything else that changes the result (e.g. analysis options)
+    """
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f"\0{model_key}\0{model_version}\0{variant}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) store of analysis results.
+
+    A result is a dict of JSON-serialisable values plus uint8 image arrays;
+    on disk the arrays are stored as PNG files next to a JSON document.
+
+    Args:
+        max_entries: Results kept in memory
+        disk_dir: Directory for the persistent tier, or None to disable it
+        max_bytes: Size budget of the disk tier (None for no limit)
+        max_age_seconds: Disk entries not read or written for this long are
+            removed (None for no limit)
+        sweep_interval: Minimum seconds between full scans of ``disk_dir``,
+            which pick up entries written by other processes
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None, max_bytes=None, max_age_seconds=None, sweep_interval=60):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Each entry directory is one entry of the bounded disk tier
+        self._disk = BoundedDirectory(disk_dir, _scan_entries, max_bytes, max_age_seconds,
+                                      sweep_interval) if disk_dir else None
+
+    def get(self, key):
+        """Return the cached result for ``key`` or None."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _entry_dir(self, key):
+        # Fan out by prefix to keep directories small
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, "result.json")) as f:
+                document = json.load(f)
+            result = document["values"]
+            for field in document["images"]:
+                img = cv2.imread(os.path.join(entry_dir, f"{field}.png"), cv2.IMREAD_UNCHANGED)
+                if img is None:
+                    return None
+                result[field] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if img.ndim == 3 else img
+        except (OSError, ValueError, KeyError):
+            # Missing, partially written or evicted entry - treat as a miss
+            return None
+        self._record_access(entry_dir)
+        return result
+
+    def _write_disk(self, key, result):
+        if not self.disk_dir:
+            return
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        values, images = {}, []
+        for field, value in result.items():
+            if isinstance(value, np.ndarray) and value.dtype == np.uint8:
+                img = cv2.cvtColor(value, cv2.COLOR_RGB2BGR) if value.ndim == 3 else value
+                cv2.imwrite(os.path.join(entry_dir, f"{field}.png"), img)
+                images.append(field)
+            elif isinstance(value, np.ndarray):
+                values[field] = value.tolist()
+            elif isinstance(value, np.generic):
+                values[field] = value.item()
+            else:
+                values[field] = value
+
+        # Write the document last and atomically: its presence marks the
+        # entry as complete for concurrent readers
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"values": values, "images": images}, f)
+        os.replace(tmp_path, os.path.join(entry_dir, "result.json"))
+        self._record_access(entry_dir)
+        self._disk.enforce_budget()
+
+    def _record_access(self, entry_dir):
+        now = time.time()
+        # The mtime of the document doubles as the last access time, so
+        # sweeps of other processes see it too
+        touch(os.path.join(entry_dir, "result.json"), now)
+        self._disk.record(entry_dir, _dir_size(entry_dir), now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+                "disk_bytes": self._disk.bytes_used() if self._disk is not None else 0,
+                "evictions": self._disk.evictions if self._disk is not None else 0,
+            }
+
+
+def _scan_entries(root):
+    """``BoundedDirectory`` scan with every entry directory as an entry."""
+    index = {}
+    for prefix in _list_dirs(root):
+        for entry_dir in _list_dirs(prefix):
+            # Entries still being written have no document yet
+            document = os.path.join(entry_dir, "result.json")
+            try:
+                last_access = os.stat(document if os.path.exists(document) else entry_dir).st_mtime
+            except OSError:
+                continue
+            index[entry_dir] = (_dir_size(entry_dir), last_access)
+    return index
+
+
+def _list_dirs(path):
+    try:
+        return [entry.path for entry in os.scandir(path) if entry.is_dir()]
+    except OSError:
+        return []
+
+
+def _dir_size(path):
+    total = 0
+    try:
+        for entry in os.scandir(path):
+            if entry.is_file():
+                total += entry.stat().st_size
+    except OSError:
+        pass
+    return total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache.
+
+    Configured with ``NEUROLENS_RESULT_CACHE_SIZE`` (in-memory entries,
+    default 64), ``NEUROLENS_RESULT_CACHE_DIR`` (enables the disk tier),
+    ``NEUROLENS_RESULT_CACHE_MAX_MB`` (default 512) and
+    ``NEUROLENS_RESULT_CACHE_MAX_AGE_HOURS`` (default 168).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                max_mb = float(os.environ.get("NEUROLENS_RESULT_CACHE_MAX_MB", 512))
+                max_age_hours = float(os.environ.get("NEUROLENS_RESULT_CACHE_MAX_AGE_HOURS", 168))
+                _cache = ResultCache(
+                    max_entries=int(os.environ.get("NEUROLENS_RESULT_CACHE_SIZE", 64)),
+                    disk_dir=os.environ.get("NEUROLENS_RESULT_CACHE_DIR") or None,
+                    max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+                    max_age_seconds=max_age_hours * 3600 if max_age_hours > 0 else None,
+                )
+    return _cache
@@ -0,0 +1,143 @@
+"""Saliency map post-processing shared by the app and headless tools.
+
+Everything works on batches: gradients of shape (N, H, W, 3) go in, RGB
+overlays of shape (N, H, W, 3) come out. Intermediate maps are float32 and
+images stay uint8, and the per-resolution brain mask is built only once.
+"""
+import functools
+
+import cv2
+import numpy as np
+
+
+@functools.lru_cache(maxsize=8)
+def brain_mask(height, width):
+    """Circular mask of the brain area for a given resolution (cached, read-only)."""
+    center = (height // 2, width // 2)
+    radius = min(center[0], center[1]) - 10
+    y, x = np.ogrid[:height, :width]
+    mask = (x - center[0])**2 + (y - center[1])**2 <= radius**2
+    mask.setflags(write=False)
+    return mask
+
+
+def _to_uint8(images):
+    images = np.asarray(images)
+    if images.dtype == np.uint8:
+        return images
+    return np.clip(np.rint(images), 0, 255).astype(np.uint8)
+
+
+def _percentile_rows(values, q):
+    """Per-row percentile with linear interpolation, like ``np.percentile``.
+
+    ``np.partition`` on the two neighbouring ranks is several times faster
+    than the full sort ``np.percentile`` does along an axis.
+    """
+    position = q / 100 * (values.shape[1] - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, values.shape[1] - 1)
+    partitioned = np.partition(values, (lower, upper), axis=1)
+    low, high = partitioned[:, lower:lower + 1], partitioned[:, upper:upper + 1]
+    return low + (high - low) * np.float32(position - lower)
+
+
+def saliency_heatmaps(gradients):
+    """Turn a batch of input gradients into normalised, thresholded maps.
+
+    Args:
+        gradients: Input gradients of shape (N, H, W, 3)
+
+    Returns:
+        float32 maps of shape (N, H, W) with values in [0, 1]
+    """
+    gradients = np.asarray(gradients, dtype=np.float32)
+    # Channel-wise maximum of |gradient|; much faster than a reduction over
+    # the short last axis
+    maps = np.maximum(np.maximum(np.abs(gradients[..., 0]), np.abs(gradients[..., 1])), np.abs(gradients[..., 2]))
+    n, height, width = maps.shape
+    mask = brain_mask(height, width)
+
+    # Normalize only the brain area, per image
+    brain = maps[:, mask]
+    low = brain.min(axis=1, keepdims=True)
+    high = brain.max(axis=1, keepdims=True)
+    spread = high - low
+    flat = spread <= 0
+    brain = (brain - np.where(flat, 0, low)) / np.where(flat, 1, spread)
+
+    # Keep only the top 20% of the brain area
+    threshold = _percentile_rows(brain, 80)
+    brain[brain < threshold] = 0
+
+    normalized = np.zeros((n, height, width), dtype=np.float32)
+    normalized[:, mask] = brain
+
+    # Apply more aggressive smoothing
+    for i in range(n):
+        cv2.GaussianBlur(normalized[i], (11, 11), 0, dst=normalized[i])
+    return normalized
+
+
+def gradcam_heatmaps(cams, height, width):
+    """Normalise Grad-CAM maps per image and upsample them for the overlay.
+
+    Args:
+        cams: Class activation maps of shape (N, h, w)
+        height, width: Size of the image the maps are drawn on
+
+    Returns:
+        float32 maps of shape (N, height, width) with values in [0, 1]
+    """
+    cams = np.asarray(cams, dtype=np.float32)
+    peak = cams.reshape(len(cams), -1).max(axis=1)[:, None, None]
+    cams = cams / np.where(peak > 0, peak, 1)
+    return np.stack([cv2.resize(cam, (width, height), interpolation=cv2.INTER_LINEAR) for cam in cams])
+
+
+def saliency_overlays(gradients, original_images, heatmaps=None):
+    """Superimpose saliency heatmaps on their source images.
+
+    Args:
+        gradients: Input gradients of shape (N, H, W, 3)
+        original_images: The model inputs as RGB arrays with values in 0-255,
+            shape (N, H', W', 3); heatmaps are resized if H', W' differ
+        heatmaps: ``saliency_heatmaps(gradients)`` if the caller already has
+            them, or maps from another method such as ``gradcam_heatmaps``
+            (``gradients`` is then unused)
+
+    Returns:
+        The overlays as an RGB uint8 array of shape (N, H', W', 3)
+    """
+    originals = _to_uint8(original_images)
+    maps = saliency_heatmaps(gradients) if heatmaps is None else heatmaps
+    n, height, width = maps.shape
+
+    # Colour maps are pointwise, so the batch is colourised as one tall image
+    heatmaps = cv2.applyColorMap((maps * 255).astype(np.uint8).reshape(n * height, width), cv2.COLORMAP_JET)
+    heatmaps = cv2.cvtColor(heatmaps, cv2.COLOR_BGR2RGB).reshape(n, height, width, 3)
+
+    if heatmaps.shape[1:3] != originals.shape[1:3]:
+        size = (originals.shape[2], originals.shape[1])
+        heatmaps = np.stack([cv2.resize(heatmap, size) for heatmap in heatmaps])
+
+    # Blend the whole batch in one uint8 call, again stacked vertically
+    n, height, width, _ = originals.shape
+    blended = cv2.addWeighted(
+        heatmaps.reshape(n * height, width, 3), 0.7,
+        originals.reshape(n * height, width, 3), 0.3, 0,
+    )
+    return blended.reshape(originals.shape)
+
+
+def saliency_overlay(gradients, original_img):
+    """Single-image convenience wrapper around ``saliency_overlays``.
+
+    Args:
+        gradients: Input gradients of shape (H, W, 3) or (1, H, W, 3)
+        original_img: The model input as an RGB array with values in 0-255
+    """
+    gradients = np.asarray(gradients)
+    if gradients.ndim == 3:
+        gradients = gradients[np.newaxis]
+    return saliency_overlays(gradients, np.asarray(original_img)[np.newaxis])[0]
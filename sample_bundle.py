@@ -0,0 +1,222 @@
+"""Precomputed analyses of the bundled sample images.
+
+The scans in ``sample_images/`` never change, so their analyses are computed
+once at build time for every model in ``MODEL_FILES`` and shipped as a single
+zip bundle: a JSON manifest with the probabilities (and optionally the Gemini
+explanations) plus PNGs of the saliency overlay and heatmap per sample and
+model. Entries are keyed with ``result_key`` exactly like the result cache,
+i.e. by the image bytes and the model version (a hash of the weights), so a
+bundle built for other weights simply stops matching and the page falls back
+to the live pipeline.
+
+Build it after exporting the models, from the repository root:
+    python sample_bundle.py [--models Xception "Custom CNN"] [--explanations]
+
+The app reads ``NEUROLENS_SAMPLE_BUNDLE`` (default ``sample_bundle.zip``).
+"""
+import argparse
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from explanations import PROMPT_VERSION
+from models import MODEL_FILES, get_registry
+from result_cache import result_key
+
+BUNDLE_FORMAT = 2
+
+
+class SampleBundle:
+    """Read-only lookup of precomputed analyses by ``result_key``.
+
+    The bundle is reopened when the file changes, so a rebuilt bundle is
+    picked up without a restart.
+
+    Args:
+        path: Path of the bundle zip
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._zip = None
+        self._entries = {}
+        self._mtime = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the precomputed result for ``key`` or None.
+
+        The result has the result cache's fields: ``probabilities``,
+        ``saliency_map``, ``saliency_heatmap`` and, if the bundle was built
+        with explanations, ``explanation``.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            png = self._zip.read(f"saliency/{key}.png")
+            heatmap_png = self._zip.read(f"heatmap/{key}.png")
+            self.hits += 1
+
+        saliency_map = cv2.cvtColor(cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+        result = {
+            "probabilities": np.asarray(entry["probabilities"], dtype=np.float32),
+            "saliency_map": saliency_map,
+            "saliency_heatmap": cv2.imdecode(np.frombuffer(heatmap_png, np.uint8), cv2.IMREAD_GRAYSCALE),
+        }
+        if entry.get("explanation") is not None:
+            result["explanation"] = entry["explanation"]
+        return result
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        if self._zip is not None:
+            self._zip.close()
+        self._zip, self._entries, self._mtime = None, {}, mtime
+        if mtime is None:
+            return
+        try:
+            self._zip = zipfile.ZipFile(self.path)
+            manifest = json.loads(self._zip.read("manifest.json"))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Unreadable bundle - serve everything live
+            return
+        if manifest.get("format") != BUNDLE_FORMAT:
+            return
+        entries = manifest["entries"]
+        # Explanations written for another prompt are not reused
+        if manifest.get("prompt_version") != PROMPT_VERSION:
+            entries = {key: dict(entry, explanation=None) for key, entry in entries.items()}
+        self._entries = entries
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def build_bundle(output_path, model_keys, image_dir="sample_images", explain=False, batch_size=16):
+    """Analyse every image under ``image_dir`` with each model and write a bundle.
+
+    Args:
+        output_path: Path of the bundle zip to write
+        model_keys: Models to precompute, keys of ``MODEL_FILES``
+        image_dir: Directory of sample images
+        explain: Also ask Gemini for an explanation of every result
+        batch_size: Images per inference batch
+
+    Returns:
+        The bundle manifest
+    """
+    # Build-time only dependencies; the app only needs SampleBundle
+    from batch_classify import find_images
+    from explanations import generate_explanation
+    from imaging import preprocess, process_image_input
+    from inference import run_inference
+    from models import LABELS
+    from saliency import saliency_heatmaps, saliency_overlays
+
+    paths = find_images(image_dir)
+    if not paths:
+        raise ValueError(f"No images found under {image_dir}")
+    # The page decodes samples with process_image_input, so do the same here
+    decoded = [process_image_input(path) for path in paths]
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "prompt_version": PROMPT_VERSION,
+        "models": {},
+        "entries": {},
+    }
+    tmp_path = output_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w") as bundle:
+        for model_key in model_keys:
+            model_entry = get_registry().get(model_key)
+            manifest["models"][model_key] = model_entry.version
+            explained = 0
+            for start in range(0, len(paths), batch_size):
+                batch = decoded[start:start + batch_size]
+                img_array = np.stack([preprocess(display_img, model_entry.img_size) for _, display_img, _ in batch])
+                probabilities, gradients = run_inference(model_entry.inference_fn, img_array)
+                heatmaps = saliency_heatmaps(gradients)
+                saliency_maps = saliency_overlays(gradients, img_array * 255.0, heatmaps=heatmaps)
+
+                for path, (image_bytes, _, _), probs, saliency_map, heatmap in zip(
+                        paths[start:], batch, probabilities, saliency_maps, heatmaps):
+                    key = result_key(image_bytes, model_key, model_entry.version)
+                    explanation = None
+                    if explain:
+                        class_index = int(np.argmax(probs))
+                        try:
+                            explanation = generate_explanation(saliency_map, LABELS[class_index],
+                                                               probs[class_index])
+                            explained += 1
+                        except Exception as e:
+                            print(f"{model_key}: no explanation for {path}: {e}")
+                    _, png = cv2.imencode(".png", cv2.cvtColor(saliency_map, cv2.COLOR_RGB2BGR))
+                    # PNGs are already compressed
+                    bundle.writestr(f"saliency/{key}.png", png.tobytes(), compress_type=zipfile.ZIP_STORED)
+                    _, png = cv2.imencode(".png", np.rint(heatmap * 255).astype(np.uint8))
+                    bundle.writestr(f"heatmap/{key}.png", png.tobytes(), compress_type=zipfile.ZIP_STORED)
+                    manifest["entries"][key] = {
+                        "model": model_key,
+                        "sample": os.path.relpath(path, image_dir),
+                        "probabilities": [float(p) for p in probs],
+                        "explanation": explanation,
+                    }
+            print(f"{model_key} ({model_entry.version}): {len(paths)} samples"
+                  + (f", {explained} explanations" if explain else ""))
+        bundle.writestr("manifest.json", json.dumps(manifest), compress_type=zipfile.ZIP_DEFLATED)
+    # Running apps keep serving the old bundle until the new one is complete
+    os.replace(tmp_path, output_path)
+    return manifest
+
+
+_bundle = None
+_bundle_lock = threading.Lock()
+
+
+def get_sample_bundle():
+    """Return the process-wide sample bundle (``NEUROLENS_SAMPLE_BUNDLE``)."""
+    global _bundle
+    if _bundle is None:
+        with _bundle_lock:
+            if _bundle is None:
+                _bundle = SampleBundle(os.environ.get("NEUROLENS_SAMPLE_BUNDLE", "sample_bundle.zip"))
+    return _bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute analyses of the bundled sample images")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES),
+                        help="Models to precompute (default: all)")
+    parser.add_argument("--images", default="sample_images",
+                        help="Directory of sample images (default: %(default)s)")
+    parser.add_argument("--output", default=os.environ.get("NEUROLENS_SAMPLE_BUNDLE", "sample_bundle.zip"),
+                        help="Bundle to write (default: %(default)s)")
+    parser.add_argument("--explanations", action="store_true",
+                        help="Also store Gemini explanations (needs GOOGLE_API_KEY)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per batch (default: %(default)s)")
+    args = parser.parse_args()
+
+    manifest = build_bundle(args.output, args.models, args.images, args.explanations, args.batch_size)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Wrote {args.output}: {len(manifest['entries'])} entries ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
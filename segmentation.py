@@ -0,0 +1,150 @@
+"""Threshold-based tumor segmentation with per-region size estimates.
+
+Pixels brighter than a per-class threshold are grouped into regions in one
+pass of OpenCV's contour filling (holes inside a region count as part of it)
+and connected-component labelling, both in C, so noisy scans with thousands
+of specks cost no more than clean ones. Regions smaller than
+``min_area_fraction`` of the image are dropped, and when a saliency heatmap
+is given only regions overlapping the salient area (the pixels within
+``saliency_threshold`` of the heatmap's peak) are kept.
+
+This is a demonstration heuristic; a real deployment would use a dedicated
+segmentation model.
+"""
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+# Intensity threshold (fraction of 255) per predicted class; no threshold
+# means nothing is segmented
+THRESHOLDS = {
+    "Glioma": 0.65,
+    "Meningioma": 0.60,
+    "Pituitary": 0.55,
+}
+
+# Simulated scale: the whole image is taken to cover this many mm²
+FIELD_OF_VIEW_MM2 = 100.0
+
+
+@dataclass
+class Region:
+    area_mm2: float
+    # Diameter of a circle with the same area
+    diameter_mm: float
+    # Bounding box (x, y, width, height) and centroid (x, y) in pixels
+    bbox: tuple
+    centroid: tuple
+    # Fraction of the region inside the salient area, if a heatmap was given
+    saliency: float = None
+
+
+@dataclass
+class Segmentation:
+    # uint8 mask of shape (H, W), 1 inside the kept regions
+    mask: np.ndarray
+    # Largest region first
+    regions: list = field(default_factory=list)
+
+    @property
+    def area_mm2(self):
+        return sum(region.area_mm2 for region in self.regions)
+
+    @property
+    def diameter_mm(self):
+        """Equivalent diameter of the total segmented area."""
+        return 2 * np.sqrt(self.area_mm2 / np.pi)
+
+
+def _equivalent_diameter(area_mm2):
+    return float(2 * np.sqrt(area_mm2 / np.pi))
+
+
+def segment_tumors(images, prediction_classes, heatmaps=None, min_area_fraction=0.001, saliency_threshold=0.5):
+    """Segment a batch of scans.
+
+    Args:
+        images: RGB uint8 images, an array of shape (N, H, W, 3) or a list of
+            (H, W, 3) arrays of any sizes
+        prediction_classes: Predicted class label of each image
+        heatmaps: Optional saliency heatmaps, one (H', W') map per image of
+            any scale, resized to the image if needed
+        min_area_fraction: Regions smaller than this fraction of the image are
+            treated as noise
+        saliency_threshold: With heatmaps, pixels at or above this fraction
+            of the heatmap's maximum form the salient area; regions that do
+            not overlap it are dropped
+
+    Returns:
+        A list of ``Segmentation``, one per image
+    """
+    results = []
+    for i, (img, prediction_class) in enumerate(zip(images, prediction_classes)):
+        height, width = img.shape[:2]
+        threshold = THRESHOLDS.get(prediction_class)
+        if threshold is None:
+            results.append(Segmentation(np.zeros((height, width), dtype=np.uint8)))
+            continue
+
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        _, binary = cv2.threshold(gray, int(255 * threshold), 1, cv2.THRESH_BINARY)
+
+        # Fill every outer contour in one call, then label the filled regions
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        filled = np.zeros_like(binary)
+        cv2.drawContours(filled, contours, -1, 1, thickness=cv2.FILLED)
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(filled, connectivity=8)
+
+        # Label 0 is the background
+        areas = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+        keep = areas >= min_area_fraction * height * width
+        keep[0] = False
+
+        saliency = None
+        if heatmaps is not None:
+            heatmap = np.asarray(heatmaps[i], dtype=np.float32)
+            if heatmap.shape != (height, width):
+                heatmap = cv2.resize(heatmap, (width, height))
+            peak = heatmap.max()
+            salient = heatmap >= saliency_threshold * peak if peak > 0 else np.zeros(heatmap.shape, dtype=bool)
+            # Salient pixels of every label at once
+            saliency = np.bincount(labels[salient], minlength=count) / np.maximum(areas, 1)
+            keep &= saliency > 0
+
+        mask = keep.astype(np.uint8)[labels]
+        pixel_mm2 = FIELD_OF_VIEW_MM2 / (height * width)
+        regions = [
+            Region(
+                area_mm2=float(areas[label] * pixel_mm2),
+                diameter_mm=_equivalent_diameter(areas[label] * pixel_mm2),
+                bbox=tuple(int(v) for v in stats[label, :4]),
+                centroid=(float(centroids[label, 0]), float(centroids[label, 1])),
+                saliency=None if saliency is None else float(saliency[label]),
+            )
+            for label in np.flatnonzero(keep)
+        ]
+        regions.sort(key=lambda region: region.area_mm2, reverse=True)
+        results.append(Segmentation(mask, regions))
+    return results
+
+
+def segmentation_overlay(img, mask, color=(0, 255, 0)):
+    """Draw the outline of ``mask`` on a copy of the RGB image ``img``."""
+    overlay = np.array(img, dtype=np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cv2.drawContours(overlay, contours, -1, color, thickness=max(1, min(mask.shape) // 150))
+    return overlay
+
+
+def segment_tumor(img, prediction_class, heatmap=None):
+    """Single-image convenience wrapper around ``segment_tumors``.
+
+    Returns:
+        A tuple of (mask, total area in mm², equivalent diameter as text, or
+        "N/A" when the class is not segmented)
+    """
+    segmentation = segment_tumors([img], [prediction_class], None if heatmap is None else [heatmap])[0]
+    if prediction_class not in THRESHOLDS:
+        return segmentation.mask, 0, "N/A"
+    return segmentation.mask, segmentation.area_mm2, f"{segmentation.diameter_mm:.2f} mm"
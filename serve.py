@@ -0,0 +1,258 @@
+"""HTTP inference service for calling NeuroLens from other tools.
+
+Concurrent requests for the same model are coalesced into micro-batches:
+a batch runs as soon as it holds ``--max-batch-size`` images or the oldest
+request has waited ``--max-wait-ms``, whichever comes first.
+
+Usage:
+    python serve.py --port 8000 --max-batch-size 8 --max-wait-ms 10
+
+Endpoints:
+    POST /predict?model=Xception&saliency=1
+        Body is either the raw image bytes or multipart/form-data with a
+        ``file`` field. Returns the prediction, confidence, per-class
+        probabilities and, with ``saliency=1``, a base64 PNG overlay.
+    GET /health
+        Liveness, the list of loaded models and the warm-up status.
+    GET /ready
+        200 once the ``--preload`` models are loaded and warmed up, 503
+        before that; point readiness probes here.
+    GET /metrics
+        Stage timings and counters in the Prometheus text format.
+"""
+import argparse
+import base64
+import email.parser
+import email.policy
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from imaging import load_image_array
+from inference import run_inference
+from metrics import get_metrics
+from models import LABELS, MODEL_FILES, get_registry
+from saliency import saliency_overlay
+from warmup import Readiness
+
+
+class MicroBatcher:
+    """Collects single-image requests for one model and runs them in batches.
+
+    Args:
+        model_entry: Registry entry of the model to run
+        max_batch_size: Largest batch sent to the model
+        max_wait_ms: Longest a request waits for others to join its batch
+    """
+
+    def __init__(self, model_entry, max_batch_size=8, max_wait_ms=10):
+        self.model_entry = model_entry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{model_entry.key}", daemon=True)
+        self._worker.start()
+
+    def submit(self, img_array, with_gradients=False):
+        """Queue one preprocessed image; the Future resolves to (probabilities, gradients)."""
+        future = Future()
+        self._queue.put((img_array, with_gradients, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        images = np.stack([img_array for img_array, _, _ in batch])
+        try:
+            with get_metrics().span("predict", model=self.model_entry.key):
+                if any(with_gradients for _, with_gradients, _ in batch):
+                    probabilities, gradients = run_inference(self.model_entry.inference_fn, images)
+                else:
+                    probabilities, gradients = self.model_entry.predict_fn(images).numpy(), None
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for i, (_, with_gradients, future) in enumerate(batch):
+            future.set_result((probabilities[i], gradients[i] if with_gradients else None))
+
+
+class InferenceService:
+    """Owns one MicroBatcher per model, created on first use."""
+
+    def __init__(self, max_batch_size=8, max_wait_ms=10):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, model_key):
+        with self._lock:
+            batcher = self._batchers.get(model_key)
+        if batcher is None:
+            # Load outside the lock; the registry serialises concurrent loads
+            model_entry = get_registry().get(model_key)
+            with self._lock:
+                # Another request may have created it meanwhile; a second
+                # batcher would leave its worker thread running unused
+                batcher = self._batchers.get(model_key)
+                if batcher is None:
+                    batcher = MicroBatcher(model_entry, self.max_batch_size, self.max_wait_ms)
+                    self._batchers[model_key] = batcher
+        return batcher
+
+    def classify(self, image_bytes, model_key, with_saliency=False):
+        batcher = self.batcher(model_key)
+        img_size = batcher.model_entry.img_size
+        with get_metrics().span("preprocess", model=model_key):
+            img_array = load_image_array(image_bytes, img_size)
+        probabilities, gradients = batcher.submit(img_array, with_saliency).result()
+
+        class_index = int(np.argmax(probabilities))
+        response = {
+            "model": model_key,
+            "prediction": LABELS[class_index],
+            "confidence": float(probabilities[class_index]),
+            "probabilities": {label: float(p) for label, p in zip(LABELS, probabilities)},
+        }
+        if gradients is not None:
+            with get_metrics().span("saliency", model=model_key):
+                overlay = saliency_overlay(gradients, img_array * 255.0)
+            ok, png = cv2.imencode(".png", cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR))
+            if ok:
+                response["saliency_png"] = base64.b64encode(png.tobytes()).decode()
+        return response
+
+
+def extract_upload(content_type, body):
+    """Return the image bytes from a raw or multipart/form-data request body."""
+    if not content_type.startswith("multipart/form-data"):
+        return body
+
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+    raise ValueError("multipart request has no 'file' field")
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections under the very
+    # concurrency micro-batching is meant to absorb
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None
+    readiness = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            loaded = [stats["model"] for stats in get_registry().stats()]
+            self._send_json(200, {"status": "ok", "models": loaded, "warmup": self.readiness.status()})
+        elif path == "/ready":
+            status = self.readiness.status()
+            self._send_json(200 if status["ready"] else 503, status)
+        elif path == "/metrics":
+            body = get_metrics().render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        params = parse_qs(url.query)
+        model_key = params.get("model", ["Xception"])[0]
+        with_saliency = params.get("saliency", ["0"])[0].lower() in ("1", "true", "yes")
+        if model_key not in MODEL_FILES:
+            self._send_json(400, {"error": f"unknown model '{model_key}'", "models": list(MODEL_FILES)})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        try:
+            image_bytes = extract_upload(self.headers.get("Content-Type", ""), body)
+            if not image_bytes:
+                raise ValueError("empty request body")
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            with get_metrics().analysis(model_key):
+                response = self.service.classify(image_bytes, model_key, with_saliency)
+        except (OSError, ValueError) as e:
+            # PIL raises UnidentifiedImageError (an OSError) for non-images
+            self._send_json(400, {"error": f"could not decode image: {e}"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuroLens HTTP inference service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=8,
+                        help="Largest micro-batch per forward pass (default: %(default)s)")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                        help="Longest a request waits for a batch to fill (default: %(default)s)")
+    parser.add_argument("--preload", nargs="*", default=[], choices=list(MODEL_FILES),
+                        help="Models to load and warm up before reporting ready")
+    args = parser.parse_args()
+
+    RequestHandler.service = InferenceService(args.max_batch_size, args.max_wait_ms)
+    get_metrics().register_stats("model", get_registry().stats, label="model")
+    # Warm up both the single-image and the full micro-batch shapes
+    RequestHandler.readiness = Readiness(args.preload, batch_sizes=sorted({1, args.max_batch_size}))
+    RequestHandler.readiness.start()
+
+    server = InferenceHTTPServer((args.host, args.port), RequestHandler)
+    print(f"Serving NeuroLens on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
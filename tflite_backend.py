@@ -0,0 +1,152 @@
+"""TensorFlow Lite inference backend.
+
+``export_models.py --tflite`` converts the models behind ``MODEL_FILES`` to
+float16 and int8 ``.tflite`` files. Both keep float32 inputs and outputs, so
+they take the same [0, 1] arrays and return the same probabilities as the
+Keras models, with much smaller weights and faster CPU kernels.
+
+TFLite graphs cannot compute input gradients, so saliency maps are still
+produced by the Keras model; the TFLite backend replaces the forward pass.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from models import INFERENCE_FILES, MODEL_INPUT_SIZES, file_version, find_artifact
+
+try:
+    # LiteRT is the standalone successor of tf.lite.Interpreter
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+QUANTIZATIONS = ("float16", "int8")
+
+# Values accepted wherever a backend can be picked
+BACKENDS = ("keras",) + tuple(f"tflite-{quantization}" for quantization in QUANTIZATIONS)
+
+# Interpreter threads per model; defaults to one per CPU
+TFLITE_THREADS = int(os.environ.get("NEUROLENS_TFLITE_THREADS", 0)) or os.cpu_count()
+
+
+def backend_quantization(backend):
+    """Return the TFLite quantization of ``backend``, or None for Keras.
+
+    Raises:
+        ValueError: If ``backend`` is not one of ``BACKENDS``.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    return None if backend == "keras" else backend.split("-", 1)[1]
+
+
+def tflite_filename(model_key, quantization):
+    """File name of a TFLite artifact, e.g. ``xception_inference_int8.tflite``."""
+    stem = os.path.splitext(INFERENCE_FILES[model_key])[0]
+    return f"{stem}_{quantization}.tflite"
+
+
+def convert_model(model, quantization, calibration_images=None):
+    """Convert a Keras model to a TFLite flatbuffer.
+
+    Args:
+        model: The Keras model
+        quantization: ``"float16"`` (float16 weights) or ``"int8"`` (integer
+            weights and activations)
+        calibration_images: Iterable of preprocessed (H, W, 3) images used to
+            calibrate the int8 activation ranges; required for int8
+
+    Returns:
+        The serialized model as bytes
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if calibration_images is None:
+            raise ValueError("int8 quantization needs calibration images")
+        images = list(calibration_images)
+
+        def representative_dataset():
+            for img in images:
+                yield [np.expand_dims(img, axis=0).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        # Integer kernels only; inputs and outputs stay float32
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown quantization: {quantization}")
+
+    return converter.convert()
+
+
+class TFLiteModel:
+    """A TFLite interpreter behind a batch ``predict`` call.
+
+    Interpreters are not thread-safe, so calls are serialized; the input
+    tensor is only reallocated when the batch size changes.
+
+    Args:
+        model_path: Path of the ``.tflite`` file
+        version: Identifier of the file, e.g. to key cached results
+        img_size: Model input size (height, width)
+        num_threads: Interpreter threads
+    """
+
+    def __init__(self, model_path, version=None, img_size=None, num_threads=TFLITE_THREADS):
+        start = time.perf_counter()
+        self.model_path = model_path
+        self.version = version
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self._input_index = self._interpreter.get_input_details()[0]["index"]
+        self._output_index = self._interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        self._lock = threading.Lock()
+        self.img_size = img_size or tuple(self._interpreter.get_input_details()[0]["shape"][1:3])
+        self.size_bytes = os.path.getsize(model_path)
+        self.load_seconds = time.perf_counter() - start
+
+    def predict(self, images):
+        """Return the class probabilities of a (N, H, W, 3) batch as a NumPy array."""
+        images = np.ascontiguousarray(images, dtype=np.float32)
+        with self._lock:
+            if images.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input_index, images.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = images.shape[0]
+            self._interpreter.set_tensor(self._input_index, images)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output_index).copy()
+
+
+def load_tflite_model(model_key, quantization):
+    """Load the exported TFLite model for ``model_key``.
+
+    Raises:
+        FileNotFoundError: If the artifact was neither exported locally nor
+            published to the model repo.
+    """
+    filename = tflite_filename(model_key, quantization)
+    path = find_artifact(filename)
+    if path is None:
+        raise FileNotFoundError(f"{filename} not found; run export_models.py --tflite {quantization}")
+    return TFLiteModel(path, version=file_version(path), img_size=MODEL_INPUT_SIZES.get(model_key))
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_tflite_model(model_key, quantization):
+    """Return the process-wide ``TFLiteModel`` for a model and quantization."""
+    key = (model_key, quantization)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = load_tflite_model(model_key, quantization)
+    return model
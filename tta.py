@@ -0,0 +1,121 @@
+"""Test-time augmentation (TTA) in one batched forward pass.
+
+Each scan is expanded into up to ``MAX_VIEWS`` deterministic views (the
+original, a horizontal flip, small shifts and brightness jitter) that are
+stacked into a single batch, so N views cost one forward pass instead of N
+``predict`` calls. The mean of the views' probabilities is the prediction
+and their per-class variance an uncertainty signal: a borderline scan whose
+prediction swings with orientation or contrast has a high variance.
+
+The number of views defaults to ``NEUROLENS_TTA_VIEWS`` (1, i.e. off). With
+``NEUROLENS_TTA_BUDGET_MS`` set, it is capped from the measured cost per view
+of earlier runs of the same model and backend so that an analysis stays
+within the budget.
+"""
+import os
+import threading
+
+import numpy as np
+
+# Fraction of the image size the shifted views move by
+SHIFT = 0.04
+# Relative brightness change of the jittered views
+JITTER = 0.1
+# Standard deviation of the predicted class above which a prediction is
+# flagged as unstable
+UNCERTAIN_STD = 0.1
+
+TTA_VIEWS = int(os.environ.get("NEUROLENS_TTA_VIEWS", 1))
+TTA_BUDGET_MS = float(os.environ.get("NEUROLENS_TTA_BUDGET_MS", 0)) or None
+
+
+def _shift(images, dy, dx):
+    """Shift a (N, H, W, C) batch by (dy, dx) pixels, filling with black."""
+    height, width = images.shape[1:3]
+    shifted = np.zeros_like(images)
+    shifted[:, max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+        images[:, max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return shifted
+
+
+def augmentations(height, width, shift=SHIFT, jitter=JITTER):
+    """The views in the order they are used, as (name, batch transform) pairs."""
+    dy, dx = max(1, round(shift * height)), max(1, round(shift * width))
+    return [
+        ("original", lambda images: images),
+        ("flip", lambda images: images[:, :, ::-1]),
+        ("shift_right", lambda images: _shift(images, 0, dx)),
+        ("shift_left", lambda images: _shift(images, 0, -dx)),
+        ("brighter", lambda images: np.clip(images * (1 + jitter), 0, 1)),
+        ("darker", lambda images: images * (1 - jitter)),
+        ("shift_down", lambda images: _shift(images, dy, 0)),
+        ("shift_up", lambda images: _shift(images, -dy, 0)),
+    ]
+
+
+MAX_VIEWS = len(augmentations(1, 1))
+
+
+def expand_views(images, views):
+    """Stack ``views`` augmented views of every image into one batch.
+
+    Args:
+        images: Preprocessed batch of shape (N, H, W, 3) scaled to [0, 1]
+        views: Views per image, from 1 (the original only) to ``MAX_VIEWS``
+
+    Returns:
+        A float32 batch of shape (N * views, H, W, 3); the views of an image
+        are adjacent and its original comes first
+    """
+    if not 1 <= views <= MAX_VIEWS:
+        raise ValueError(f"views must be between 1 and {MAX_VIEWS}, got {views}")
+    images = np.asarray(images, dtype=np.float32)
+    if views == 1:
+        return images
+    transforms = augmentations(*images.shape[1:3])[:views]
+    stacked = np.stack([transform(images) for _, transform in transforms], axis=1)
+    return stacked.reshape((-1,) + images.shape[1:])
+
+
+def reduce_views(probabilities, views):
+    """Mean and per-class variance of the views' probabilities.
+
+    Args:
+        probabilities: Probabilities of a batch from ``expand_views``, shape
+            (N * views, classes)
+
+    Returns:
+        A tuple of (mean, variance), each of shape (N, classes)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    grouped = probabilities.reshape(-1, views, probabilities.shape[-1])
+    return grouped.mean(axis=1), grouped.var(axis=1)
+
+
+# (model key, backend) -> smoothed seconds per view; Keras and the TFLite
+# variants of a model run at very different speeds
+_seconds_per_view = {}
+_lock = threading.Lock()
+
+
+def record_cost(model_key, backend, views, seconds):
+    """Remember how long a forward pass of ``backend`` over ``views`` views took."""
+    per_view = seconds / views
+    with _lock:
+        previous = _seconds_per_view.get((model_key, backend))
+        # Smooth out one-off stalls
+        _seconds_per_view[(model_key, backend)] = per_view if previous is None else 0.5 * (previous + per_view)
+
+
+def views_within_budget(model_key, backend, views, budget_ms=TTA_BUDGET_MS):
+    """Cap ``views`` so the forward pass of ``model_key`` on ``backend`` fits ``budget_ms``.
+
+    The cost per view is taken from earlier runs (the fixed cost of a pass is
+    counted as per-view cost, which errs on the safe side). Until a run was
+    recorded, or without a budget, ``views`` is returned unchanged.
+    """
+    with _lock:
+        per_view = _seconds_per_view.get((model_key, backend))
+    if budget_ms is None or per_view is None:
+        return views
+    return max(1, min(views, int(budget_ms / 1000 / per_view)))
@@ -0,0 +1 @@
+"""Page scripts rendered by app.py, imported only when their page is opened."""
@@ -0,0 +1,76 @@
+"""About page."""
+import streamlit as st
+
+
+def render():
+    st.title("About NeuroLens")
+    
+    st.markdown("""
+    <div class="info-box">
+        <h3>Project Overview</h3>
+        <p>NeuroLens is an advanced brain MRI analysis tool that leverages deep learning to assist medical professionals in detecting and classifying brain tumors.</p>
+        <p>Developed as part of medical imaging research, this application showcases how AI can be used to enhance diagnostic capabilities in neurology.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="card">
+        <h3>Technical Details</h3>
+        <p><strong>Models:</strong> The application uses two types of models:</p>
+        <ul>
+            <li><strong>Transfer Learning with Xception:</strong> A pre-trained Xception architecture fine-tuned on brain MRI data.</li>
+            <li><strong>Custom CNN:</strong> A custom-built convolutional neural network specifically designed for brain tumor classification.</li>
+        </ul>
+        <p><strong>Explainability:</strong> Gradient-based saliency maps highlight regions that contribute most significantly to model decisions.</p>
+        <p><strong>AI Explanations:</strong> Powered by Google's Gemini model, producing human-like explanations of findings.</p>
+        <p><strong>User Interface:</strong> Built with Streamlit for a seamless, interactive experience.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="card">
+        <h3>Dataset</h3>
+        <p>Models were trained on a dataset containing labeled MRI scans of:</p>
+        <ul>
+            <li>Glioma tumors</li>
+            <li>Meningioma tumors</li>
+            <li>Pituitary tumors</li>
+            <li>No tumor (healthy) scans</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Remove the entire "Manage Sample Images" expander section
+    
+    st.markdown("### References & Acknowledgements")
+    
+    # Remove the column structure and Research Papers section
+    st.markdown("""
+    <div class="card">
+        <h4>Technologies Used</h4>
+        <ul>
+            <li>TensorFlow & Keras for deep learning models</li>
+            <li>Streamlit for the web interface</li>
+            <li>Plotly for interactive visualizations</li>
+            <li>OpenCV for image processing</li>
+            <li>Google's Gemini for explanations</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="warning-box" style="margin-top: 20px;">
+        <h4>Disclaimer</h4>
+        <p>NeuroLens is a demonstration tool and is not FDA-approved for clinical use. All predictions should be verified by qualified healthcare professionals. This application is intended for research and educational purposes only.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("### Contact & Feedback")
+    
+    st.markdown("""
+    <div class="card">
+        <p>For questions, feedback, or collaboration opportunities, please contact:</p>
+        <p><strong>Email:</strong> <a href="mailto:chhabrapranav2001@gmail.com" style="color: #2196F3;">chhabrapranav2001@gmail.com</a></p>
+        <p><strong>GitHub:</strong> <a href="https://github.com/pc9350/neurolens-brain-tumor-classifier" style="color: #2196F3;">pc9350/neurolens-brain-tumor-classifier</a></p>
+    </div>
+    """, unsafe_allow_html=True)
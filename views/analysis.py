@@ -0,0 +1,676 @@
+"""Analysis page: classification, saliency map, explanation and report.
+
+This module is only imported when the page is opened, so sessions that stay
+on Home or About never load TensorFlow, OpenCV, Plotly or the Gemini SDK.
+"""
+import concurrent.futures
+import os
+from datetime import datetime
+
+import cv2
+import google.generativeai as genai
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+from artifacts import get_artifact_store
+from attribution import ALL_CLASS_SALIENCY, IG_STEPS, SALIENCY_METHOD, SALIENCY_METHODS, SMOOTHGRAD_SAMPLES
+from ensemble import ENSEMBLE_WEIGHTS, analyse_ensemble, analyse_model, result_variant, unstack_classes
+from explanations import EXPLANATION_TIMEOUT, fallback_explanation, get_explanation_service
+from gallery import get_gallery
+from history import get_history_store
+from imaging import preprocess, process_image_input
+from metrics import get_metrics
+from models import ENSEMBLE, LABELS, MODEL_FILES, get_registry
+from reports import can_inline, generate_report, report_payload
+from result_cache import get_result_cache, result_key
+from sample_bundle import get_sample_bundle
+from segmentation import THRESHOLDS, segment_tumors, segmentation_overlay
+from tflite_backend import BACKENDS, backend_quantization, get_tflite_model
+from tta import MAX_VIEWS, TTA_BUDGET_MS, TTA_VIEWS, UNCERTAIN_STD, views_within_budget
+from warmup import get_readiness
+
+# Saliency maps and reports are kept in a bounded, content-addressed store
+artifact_store = get_artifact_store()
+# Saliency maps and reports stay in memory unless explicitly asked to be saved
+save_saliency_maps = os.environ.get("NEUROLENS_SAVE_SALIENCY_MAPS", "").lower() in ("1", "true", "yes")
+save_reports = os.environ.get("NEUROLENS_SAVE_REPORTS", "").lower() in ("1", "true", "yes")
+# Tumor segmentation is shown unless turned off
+segmentation_enabled = os.environ.get("NEUROLENS_SEGMENTATION", "1").lower() not in ("0", "false", "no")
+
+sample_bundle = get_sample_bundle()
+readiness = get_readiness()
+metrics = get_metrics()
+metrics.register_stats("result_cache", get_result_cache().stats)
+metrics.register_stats("artifacts", artifact_store.stats)
+metrics.register_stats("sample_bundle", sample_bundle.stats)
+
+
+def configure_gemini():
+    try:
+        # Get API key from Streamlit secrets
+        api_key = st.secrets["GOOGLE_API_KEY"]
+        genai.configure(api_key=api_key)
+    except Exception as e:
+        st.warning("Google API key not configured. AI explanations will have limited functionality.")
+        # Don't expose the full error details in production
+
+
+def get_explanation(future, model_prediction, confidence):
+    """Wait for a background explanation, falling back on timeout or error.
+
+    Args:
+        future: Future from ``ExplanationService.submit``
+        model_prediction: Predicted class label
+        confidence: Probability of the predicted class
+
+    Returns:
+        A tuple of (explanation text, whether it came from Gemini)
+    """
+    try:
+        return future.result(timeout=EXPLANATION_TIMEOUT), True
+    except concurrent.futures.TimeoutError:
+        # The request keeps running and is cached, so a rerun will pick it up
+        return fallback_explanation(model_prediction, confidence, "yet because the AI service is slow to respond. It will appear when you revisit this scan"), False
+    except Exception as e:
+        st.warning(f"Could not generate AI explanation. Error: {str(e)}")
+        return fallback_explanation(model_prediction, confidence), False
+
+
+# Display sample images in a grid
+def display_sample_grid(samples, category_name, gallery, page_size=12):
+    """Display a grid of sample thumbnails with selection buttons.
+    
+    Args:
+        samples: List of ``gallery.Sample`` entries of the category
+        category_name: Name of the tumor category for display
+        gallery: The ``SampleGallery`` the thumbnails are read from
+        page_size: Number of samples shown at once
+        
+    Returns:
+        Selected sample path or None if no selection made
+    """
+    if not samples:
+        st.info(f"No {category_name} samples found. You can add sample images in the About page.")
+        return None
+            
+    st.write(f"**Available {category_name} samples:**")
+    
+    # Large reference libraries are paged so a rerun only sends a few thumbnails
+    offset = 0
+    if len(samples) > page_size:
+        pages = (len(samples) + page_size - 1) // page_size
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"{category_name}_page")
+        offset = (page - 1) * page_size
+    
+    # Create a grid of images (3 columns)
+    cols = st.columns(min(3, len(samples)))
+    selected_sample = None
+    
+    for i, sample in enumerate(samples[offset:offset + page_size], start=offset):
+        with cols[(i - offset) % 3]:
+            # Thumbnails are pre-sized, so they are shown at their own width
+            st.image(gallery.thumbnail(sample), caption=f"Sample {i+1}", width=sample.thumbnail_width)
+            if st.button(f"Select Sample {i+1}", key=f"{category_name}_{i}", use_container_width=True):
+                selected_sample = sample.path
+    
+    return selected_sample
+
+
+def render():
+    configure_gemini()
+
+    # Analysis page with reorganized flow and simplified model selection
+
+    # Only keep one title
+    st.title("Brain Tumor Classification")
+    
+    # Create a model selection header
+    st.subheader("Select Model for Analysis")
+    
+    # Initialize model_choice from session state or set default to "Xception"
+    if 'model_choice' not in st.session_state:
+        st.session_state.model_choice = "Xception"
+    
+    # The absolute most basic radio implementation possible, with a container to make it stand out
+    with st.container():
+        st.markdown("""
+        <style>
+        div[data-testid="stRadio"] > div {
+            background-color: #ffffff !important;
+            padding: 15px !important;
+            border-radius: 8px !important;
+            margin-bottom: 20px !important;
+        }
+        div[data-testid="stRadio"] label {
+            color: #000000 !important;
+            font-size: 18px !important;
+            font-weight: bold !important;
+        }
+        div[data-testid="stRadio"] div[role="radiogroup"] > label {
+            padding: 10px !important;
+            margin: 5px !important;
+            background-color: #f0f0f0 !important;
+            border-radius: 5px !important;
+        }
+        div[data-testid="stRadio"] div[role="radiogroup"] > label:hover {
+            background-color: #d0d0d0 !important;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+        
+        # Add back the radio button for model selection
+        model_choice = st.radio(
+            "Select Model",  # Proper label for accessibility
+            list(MODEL_FILES) + [ENSEMBLE],
+            horizontal=True,  # Horizontal layout for better visibility
+            label_visibility="collapsed"  # Hide the label since we have a subheader
+        )
+    
+    # Update the session state
+    st.session_state.model_choice = model_choice
+    # The ensemble runs every model on the same scan
+    ensemble = model_choice == ENSEMBLE
+    model_keys = list(MODEL_FILES) if ensemble else [model_choice]
+    
+    # Display selected model in a visible card
+    st.markdown(f"""
+    <div style="
+        background-color: #28a745; 
+        color: white; 
+        padding: 10px; 
+        border-radius: 5px; 
+        text-align: center; 
+        margin-bottom: 20px;
+        font-weight: bold;">
+        Currently using: {" + ".join(model_keys) + " ensemble" if ensemble else model_choice + " model"}
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Fetch the selected models from the process-wide registry. They are
+    # loaded once per process and shared by every session, so reruns are free.
+    model_entries = {}
+    for model_key in model_keys:
+        try:
+            model_entries[model_key] = get_registry().get(model_key)
+        except Exception as e:
+            st.error(f"Error loading {model_key} model: {str(e)}")
+            st.stop()
+        model_entry = model_entries[model_key]
+        warmup_status = readiness.model_status(model_key)
+        st.caption(
+            f"{model_key} loaded in {model_entry.load_seconds:.1f}s "
+            f"· {model_entry.size_bytes / (1024 * 1024):.0f} MB resident"
+            + (f" · warmed up in {sum(warmup_status['warmup_seconds'].values()):.1f}s"
+               if warmup_status["state"] == "ready" else "")
+        )
+
+    # Quantized TFLite models make the prediction cheaper; the saliency map
+    # still needs the gradients of the Keras model
+    backend = st.selectbox(
+        "Inference backend",
+        BACKENDS,
+        format_func=lambda b: "Keras (float32)" if b == "keras" else f"TFLite {backend_quantization(b)}",
+        help="TFLite models are created with export_models.py --tflite",
+    )
+    tflite_models = {}
+    if backend != "keras":
+        try:
+            tflite_models = {model_key: get_tflite_model(model_key, backend_quantization(backend))
+                             for model_key in model_keys}
+        except FileNotFoundError as e:
+            st.warning(f"{e}. Using the Keras model instead.")
+            backend, tflite_models = "keras", {}
+
+    # Test-time augmentation classifies several views of the scan in one batch
+    tta_views = st.slider(
+        "Test-time augmentation views",
+        min_value=1,
+        max_value=MAX_VIEWS,
+        value=min(TTA_VIEWS, MAX_VIEWS),
+        help="Flipped, shifted and brightness-jittered views of the scan are classified in one batch; "
+             "their spread shows how stable the prediction is. 1 turns it off.",
+    )
+    if tta_views > 1:
+        # The models run side by side, so the slowest one sets the limit
+        capped = min(views_within_budget(model_key, backend, tta_views) for model_key in model_keys)
+        if capped < tta_views:
+            st.caption(f"Using {capped} views to stay within the {TTA_BUDGET_MS:.0f} ms budget")
+            tta_views = capped
+
+    # SmoothGrad and Integrated Gradients average many gradients, computed
+    # in memory-capped batches
+    saliency_method = st.selectbox(
+        "Saliency method",
+        list(SALIENCY_METHODS),
+        index=list(SALIENCY_METHODS).index(SALIENCY_METHOD),
+        format_func=SALIENCY_METHODS.get,
+        help="SmoothGrad and Integrated Gradients give cleaner maps than the plain gradient "
+             "at the cost of more gradient evaluations.",
+    )
+    saliency_samples = None
+    if saliency_method == "smoothgrad":
+        saliency_samples = st.slider("SmoothGrad samples", min_value=5, max_value=100, step=5,
+                                     value=min(max(SMOOTHGRAD_SAMPLES, 5), 100))
+    elif saliency_method == "integrated_gradients":
+        saliency_samples = st.slider("Integrated Gradients steps", min_value=8, max_value=128, step=8,
+                                     value=min(max(IG_STEPS, 8), 128))
+    # The maps of every class share one forward pass and are cached with
+    # the analysis, so switching between them below reruns nothing
+    all_classes = st.checkbox(
+        "Saliency maps for every class",
+        value=ALL_CLASS_SALIENCY,
+        help="Also shows what the model sees for the classes it did not pick.",
+    )
+
+    # SECOND - Now show tabs for upload or sample selection
+    upload_tab, sample_tab = st.tabs(["Upload Your Image", "Try Sample Images"])
+    
+    with upload_tab:
+        st.write("Upload an image of a brain MRI scan to classify.")
+        # A new upload replaces a previously selected sample
+        uploaded_file = st.file_uploader("Choose an image....", type=["jpg", "jpeg", "png"],
+                                         on_change=lambda: st.session_state.pop("selected_sample", None))
+    
+    with sample_tab:
+        st.write("Select a sample brain MRI scan to analyze.")
+        
+        # Samples come from the thumbnail manifest, which is only rebuilt
+        # when sample_images/ changes
+        gallery = get_gallery()
+        samples = gallery.samples()
+        
+        # Create a tab for each tumor type
+        tumor_tabs = st.tabs(list(samples))
+        
+        # Display sample grids in each tab and handle selection
+        for tumor_tab, (category_name, category_samples) in zip(tumor_tabs, samples.items()):
+            with tumor_tab:
+                selected_sample = display_sample_grid(category_samples, category_name, gallery)
+                if selected_sample:
+                    # The button is only pressed for one rerun; later ones,
+                    # e.g. from the widgets below the results, keep the sample
+                    st.session_state.selected_sample = selected_sample
+                    st.success(f"Selected {category_name} sample for analysis")
+        if st.session_state.get("selected_sample"):
+            uploaded_file = st.session_state.selected_sample
+        
+        # If no samples found in any category, show a message
+        if not any(samples.values()):
+            st.warning("""
+            No sample images found. To use this feature:
+            
+            1. Go to the About page
+            2. Expand the "🖼️ Manage Sample Images" section 
+            3. Upload sample images for each tumor type
+            """)
+            st.info("You can continue using the 'Upload Your Image' tab to upload your own images.")
+            uploaded_file = None
+    
+    # THIRD - Process the image if one is selected
+    if uploaded_file is not None:
+        # Decode once; the array is passed to every stage below and nothing
+        # is written to disk
+        with metrics.span("decode"):
+            image_bytes, display_img, uploaded_file_name = process_image_input(uploaded_file)
+        
+        # Store current image info in session state
+        st.session_state.current_image_name = uploaded_file_name
+        
+        # Add a divider before analysis
+        st.markdown("<hr style='margin: 20px 0; border-color: rgba(255,255,255,0.1);'>", unsafe_allow_html=True)
+        st.subheader(f"Analyzing with {model_choice} Model")
+        
+        with st.spinner(f"Processing image with {model_choice} model..."), \
+                metrics.analysis(model_choice) as analysis_outcome:
+            # Process the image with the selected model
+            labels = LABELS
+
+            # The same image analysed by the same model weights always gives
+            # the same result, so reruns and repeat uploads reuse it
+            result_cache = get_result_cache()
+            # Everything besides the weights that changes a model's result
+            variants = {model_key: result_variant(backend, tflite_models.get(model_key), tta_views, saliency_method,
+                                                  saliency_samples, all_classes)
+                        for model_key in model_keys}
+            if ensemble:
+                # Keyed by every model's weights, options and vote weight
+                cache_key = result_key(
+                    image_bytes, ENSEMBLE, "+".join(entry.version for entry in model_entries.values()),
+                    variant=",".join(f"{model_key}={ENSEMBLE_WEIGHTS.get(model_key, 1.0)}:{variants[model_key]}"
+                                     for model_key in model_keys),
+                )
+            else:
+                cache_key = result_key(image_bytes, model_choice, model_entries[model_choice].version,
+                                       variant=variants[model_choice])
+            cached = result_cache.get(cache_key)
+            if cached is None:
+                # Bundled samples are precomputed at build time
+                cached = sample_bundle.get(cache_key)
+            # Reruns and repeat uploads are not counted as analyses
+            analysis_outcome["cached"] = cached is not None
+
+            if cached is None:
+                if ensemble:
+                    # Both models run concurrently on inputs resized from
+                    # the one decoded image
+                    analysed = analyse_ensemble(image_bytes, display_img, model_entries, tflite_models, backend,
+                                                tta_views=tta_views, saliency_method=saliency_method,
+                                                saliency_samples=saliency_samples, all_classes=all_classes)
+                else:
+                    analysed = analyse_model(model_choice, model_entries[model_choice], display_img,
+                                             tflite_models.get(model_choice), tta_views=tta_views,
+                                             saliency_method=saliency_method, saliency_samples=saliency_samples,
+                                             all_classes=all_classes, backend=backend)
+            else:
+                analysed = cached
+            probabilities = np.asarray(analysed["probabilities"], dtype=np.float32)
+            class_index = np.argmax(probabilities)
+            saliency_map = analysed["saliency_map"]
+            # Entries cached before heatmaps were stored segment ungated
+            saliency_heatmap = analysed.get("saliency_heatmap")
+            # The saliency maps of every class, stacked, if they were drawn
+            class_saliency_maps = analysed.get("class_saliency_maps")
+            class_saliency_heatmaps = analysed.get("class_saliency_heatmaps")
+            # Per-model probabilities and the model the saliency map is from
+            model_probabilities = {model_key: np.asarray(model_probs, dtype=np.float32)
+                                   for model_key, model_probs in analysed.get("model_probabilities", {}).items()}
+            saliency_model = analysed.get("saliency_model", model_choice)
+            # Spread of the test-time augmentation views, if any
+            probability_variance = analysed.get("probability_variance")
+            if probability_variance is not None:
+                probability_variance = np.asarray(probability_variance, dtype=np.float32)
+            img_size = model_entries[saliency_model].img_size
+
+            result = labels[class_index]
+            confidence = probabilities[class_index]
+
+            # Gemini works on the explanation while the results render
+            explanation_future = None
+            if cached is None or "explanation" not in cached:
+                explanation_future = get_explanation_service().submit(saliency_map, result, confidence)
+
+            # The model input as uint8, the image the saliency map is drawn on
+            original_img = np.rint(preprocess(display_img, img_size) * 255).astype(np.uint8)
+
+            segmentation = None
+            if segmentation_enabled and result in THRESHOLDS:
+                with metrics.span("segmentation", model=model_choice):
+                    segmentation = segment_tumors(
+                        [original_img], [result], None if saliency_heatmap is None else [saliency_heatmap])[0]
+
+            saliency_map_path = None
+            if save_saliency_maps:
+                _, png = cv2.imencode(".png", cv2.cvtColor(saliency_map, cv2.COLOR_RGB2BGR))
+                saliency_map_path = artifact_store.put(png.tobytes(), ".png")
+
+            # Display images
+            col1, col2 = st.columns(2)
+            with col1:
+                st.image(display_img, caption="Uploaded Image", use_container_width=True)
+            with col2:
+                shown_map, saliency_details = saliency_map, []
+                if class_saliency_maps is not None:
+                    explained = st.radio("Explain class", labels, index=int(class_index), horizontal=True)
+                    shown_map = unstack_classes(class_saliency_maps)[labels.index(explained)]
+                    saliency_details.append(explained)
+                saliency_details += ([saliency_model] if ensemble else []) + (
+                    [SALIENCY_METHODS[saliency_method]] if saliency_method != "gradient" else [])
+                st.image(shown_map, caption="Saliency Map" + (f" ({', '.join(saliency_details)})"
+                                                              if saliency_details else ""),
+                         use_container_width=True)
+
+            # Show results
+            st.write("## Classification Results")
+            st.markdown(
+                f"""
+                <div style="background-color: #000000; color: #ffffff; padding: 30px; border-radius: 15px;">
+                  <div style="display: flex; justify-content: space-between; align-items: center:">
+                    <div style="flex: 1; text-align: center;">
+                      <h3 style="color: #ffffff; margin-bottom: 10px; font-size: 20px;">Prediction</h3>
+                      <p style="font-size: 36px; font-weight: 800; color: #FF0000; margin: 0;">
+                        {result}
+                      </p>
+                    </div>
+                    <div style="width: 2px; height: 80px; background-color: #ffffff; margin: 0 20px;"></div>
+                    <div style="flex: 1; text-align: center;">
+                      <h3 style="color: #ffffff; margin-bottom: 10px; font-size: 20px;">Confidence</h3>
+                      <p style="font-size: 36px; font-weight: 800; color: #2196F3; margin: 0;">
+                        {confidence:.4%}
+                      </p>
+                    </div>
+                  </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+            # Probability breakdown
+            st.write("### Probability Breakdown")
+            st.write("Detailed probability scores for each tumor class:")
+            
+            sorted_indices = np.argsort(probabilities)[::-1]
+            sorted_labels = [labels[i] for i in sorted_indices]
+            sorted_probabilities = probabilities[sorted_indices]
+
+            # Bar chart
+            fig = go.Figure(go.Bar(
+                name=model_choice,
+                x=sorted_probabilities,
+                y=sorted_labels,
+                orientation='h',
+                marker_color=['red' if label == result else 'blue' for label in sorted_labels],
+                # One standard deviation across the augmented views
+                error_x=None if probability_variance is None else dict(
+                    type='data', array=np.sqrt(probability_variance[sorted_indices]), color='#FFFFFF'),
+            ))
+            # The ensemble also shows each model's own probabilities
+            for model_key, model_probs in model_probabilities.items():
+                fig.add_trace(go.Bar(
+                    name=f"{model_key} (weight {ENSEMBLE_WEIGHTS.get(model_key, 1.0):g})",
+                    x=model_probs[sorted_indices],
+                    y=sorted_labels,
+                    orientation='h',
+                    opacity=0.6,
+                ))
+            if model_probabilities:
+                fig.update_layout(barmode='group', legend=dict(font=dict(color='#FFFFFF')))
+
+            fig.update_layout(
+                title=f'Probability Analysis ({model_choice} Model)',
+                xaxis=dict(
+                  title='Probability',
+                  title_font=dict(color='#FFFFFF'),
+                  tickfont=dict(color='#FFFFFF')
+                ),
+                yaxis=dict(
+                  title='Class',
+                  title_font=dict(color='#FFFFFF'),
+                  tickfont=dict(color='#FFFFFF'),
+                  autorange='reversed'
+                ),
+                height=400,
+                # Remove fixed width to allow responsive sizing
+                plot_bgcolor='#1c1c1c',
+                paper_bgcolor='#1c1c1c',
+                font=dict(color='#FFFFFF'),
+                title_font=dict(color='#FFFFFF'),
+                margin=dict(l=50, r=50, t=80, b=50)  # Add proper margins
+            )
+
+            # Add value labels
+            if model_probabilities:
+                # Grouped bars are labelled in place
+                fig.update_traces(texttemplate='%{x:.4f}', textposition='outside')
+            else:
+                for i, prob in enumerate(sorted_probabilities):
+                    fig.add_annotation(
+                        x=prob,
+                        y=i,
+                        text=f'{prob:.4f}',
+                        showarrow=False,
+                        xanchor='left',
+                        xshift=5
+                    )
+
+            # Use the full width of the container
+            st.plotly_chart(fig, use_container_width=True)
+
+            if probability_variance is not None:
+                uncertainty = float(np.sqrt(probability_variance[class_index]))
+                st.caption(f"Mean of {tta_views} augmented views · {result} varies by ±{uncertainty:.2%} "
+                           "(one standard deviation) across them")
+                if uncertainty > UNCERTAIN_STD:
+                    st.warning("The prediction changes noticeably under small flips, shifts and brightness "
+                               "changes of the scan. Treat it as borderline.")
+
+            if segmentation is not None:
+                st.write("### Tumor Segmentation")
+                if segmentation.regions:
+                    seg_col1, seg_col2 = st.columns(2)
+                    with seg_col1:
+                        st.image(segmentation_overlay(original_img, segmentation.mask),
+                                 caption="Segmented Regions", use_container_width=True)
+                    with seg_col2:
+                        st.metric("Segmented Area", f"{segmentation.area_mm2:.2f} mm²")
+                        st.metric("Equivalent Diameter", f"{segmentation.diameter_mm:.2f} mm")
+                        st.dataframe(
+                            [{"Region": i + 1, "Area (mm²)": round(region.area_mm2, 2),
+                              "Diameter (mm)": round(region.diameter_mm, 2)}
+                             for i, region in enumerate(segmentation.regions)],
+                            hide_index=True, use_container_width=True,
+                        )
+                    st.caption("Threshold-based estimate on a simulated scale; not a clinical measurement.")
+                else:
+                    st.info("No region above the size threshold was found in the salient area.")
+
+            # Model explanation - filled in once Gemini responds, after the
+            # report below is already on offer
+            st.write("## Explanation:")
+            explanation_placeholder = st.empty()
+            if explanation_future is None:
+                explanation, explained = cached["explanation"], True
+                explanation_placeholder.write(explanation)
+            else:
+                explanation_placeholder.info("Generating AI explanation...")
+
+            def build_report(explanation):
+                with metrics.span("report"):
+                    # The upload is inlined as it is when possible instead of
+                    # being encoded again
+                    report_html = generate_report(
+                        image_bytes if can_inline(image_bytes) else original_img, saliency_map, result,
+                        confidence, explanation, segmentation=segmentation, segmentation_img=original_img,
+                    )
+                report_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+                return report_html, f"neurolens_report_{result.lower()}_{report_time}.html"
+
+            st.write("## Download Analysis Report")
+            st.write("You can download a detailed report of this analysis for offline viewing or sharing.")
+            
+            # Download button styling
+            st.markdown("""
+            <style>
+            div.stDownloadButton > button {
+                background: linear-gradient(90deg, #11998e, #38ef7d);
+                color: white;
+                font-weight: 600;
+                padding: 0.7rem 1.5rem;
+                border-radius: 8px;
+                border: none;
+                transition: all 0.3s ease;
+                box-shadow: 0 2px 5px rgba(0, 0, 0, 0.2);
+            }
+            div.stDownloadButton > button:hover {
+                transform: translateY(-2px);
+                box-shadow: 0 5px 15px rgba(17, 153, 142, 0.4);
+            }
+            </style>
+            """, unsafe_allow_html=True)
+            
+            download_placeholder = st.empty()
+
+            # Generate and prepare download report
+            if explanation_future is None:
+                report_html = cached["report_html"]
+                report_filename = cached["report_filename"]
+                report_path = cached["report_path"]
+                report_data, download_name, report_mime = report_payload(report_html, report_filename)
+            else:
+                if not explanation_future.done():
+                    # Offer the report without the explanation while Gemini
+                    # responds; it is replaced once the explanation is in
+                    draft_html, draft_filename = build_report(fallback_explanation(
+                        result, confidence, "yet because it was still being generated when this report was "
+                        "created. Download the report again once the explanation appears"))
+                    draft_data, draft_name, draft_mime = report_payload(draft_html, draft_filename)
+                    download_placeholder.download_button(
+                        label="Download Analysis Report",
+                        data=draft_data,
+                        file_name=draft_name,
+                        mime=draft_mime,
+                        use_container_width=True,
+                        key="report_download_draft",
+                    )
+                explanation, explained = get_explanation(explanation_future, result, confidence)
+                explanation_placeholder.write(explanation)
+
+                report_html, report_filename = build_report(explanation)
+                report_data, download_name, report_mime = report_payload(report_html, report_filename)
+                report_path = None
+                if save_reports:
+                    report_path = artifact_store.put(report_data, ".html.gz" if download_name.endswith(".gz") else ".html")
+
+                # Fallback explanations are not cached, so a later visit
+                # retries Gemini and rebuilds the report
+                cache_entry = {"probabilities": probabilities, "saliency_map": saliency_map}
+                if saliency_heatmap is not None:
+                    cache_entry["saliency_heatmap"] = saliency_heatmap
+                if probability_variance is not None:
+                    cache_entry["probability_variance"] = probability_variance
+                if class_saliency_maps is not None:
+                    cache_entry.update({
+                        "class_saliency_maps": class_saliency_maps,
+                        "class_saliency_heatmaps": class_saliency_heatmaps,
+                    })
+                if ensemble:
+                    cache_entry.update({
+                        "model_probabilities": {model_key: model_probs.tolist()
+                                                for model_key, model_probs in model_probabilities.items()},
+                        "saliency_model": saliency_model,
+                    })
+                if explained:
+                    cache_entry.update({
+                        "explanation": explanation,
+                        "report_html": report_html,
+                        "report_filename": report_filename,
+                        "report_path": report_path,
+                    })
+                result_cache.put(cache_key, cache_entry)
+
+            download_placeholder.download_button(
+                label="Download Analysis Report",
+                data=report_data,
+                file_name=download_name,
+                mime=report_mime,
+                use_container_width=True,
+                key="report_download",
+            )
+            
+            # Record the analysis once, not on every rerun of the page
+            if st.session_state.get("last_recorded_analysis") != cache_key:
+                get_history_store().record(
+                    image_bytes,
+                    filename=uploaded_file_name,
+                    model=model_choice,
+                    backend=backend,
+                    prediction=result,
+                    confidence=confidence,
+                    probabilities=probabilities,
+                    explanation=explanation if explained else None,
+                    result_key=cache_key,
+                    saliency_map_path=saliency_map_path,
+                    report_path=report_path,
+                )
+                st.session_state.last_recorded_analysis = cache_key
@@ -0,0 +1,159 @@
+"""History page: browse, filter and re-open past analyses.
+
+Past results are re-opened from what was kept for them (the result cache,
+the sample bundle or the artifact store), never by running the model again.
+"""
+import math
+from datetime import date, datetime, time, timedelta
+
+import streamlit as st
+
+from history import get_history_store
+from models import ENSEMBLE, LABELS, MODEL_FILES
+
+PAGE_SIZE = 20
+
+
+def load_artifacts(analysis):
+    """Find the saliency map and report of a past analysis.
+
+    Returns:
+        A tuple of (saliency map array or None, (data, file name, MIME type)
+        of the report or None)
+    """
+    import cv2
+    import numpy as np
+
+    from artifacts import get_artifact_store
+    from reports import report_payload
+    from result_cache import get_result_cache
+    from sample_bundle import get_sample_bundle
+
+    saliency_map, report = None, None
+    key = analysis["result_key"]
+    cached = (get_result_cache().get(key) or get_sample_bundle().get(key)) if key else None
+    if cached is not None:
+        saliency_map = cached.get("saliency_map")
+        if "report_html" in cached:
+            report = report_payload(cached["report_html"], cached["report_filename"])
+
+    artifact_store = get_artifact_store()
+    if saliency_map is None and analysis["saliency_map_path"]:
+        png = artifact_store.get(analysis["saliency_map_path"])
+        if png is not None:
+            saliency_map = cv2.cvtColor(cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR),
+                                        cv2.COLOR_BGR2RGB)
+    if report is None and analysis["report_path"]:
+        data = artifact_store.get(analysis["report_path"])
+        if data is not None:
+            compressed = analysis["report_path"].endswith(".gz")
+            report = (data, f"neurolens_report_{analysis['prediction'].lower()}_{analysis['id']}.html"
+                      + (".gz" if compressed else ""), "application/gzip" if compressed else "text/html")
+    return saliency_map, report
+
+
+def show_analysis(analysis):
+    store = get_history_store()
+    st.subheader(f"Analysis #{analysis['id']}: {analysis['filename']}")
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Prediction", analysis["prediction"])
+    col2.metric("Confidence", f"{analysis['confidence']:.2%}")
+    col3.metric("Model", analysis["model"])
+
+    repeats = store.count(image_hash=analysis["image_hash"])
+    st.caption(f"Analysed on {datetime.fromtimestamp(analysis['created_at']):%Y-%m-%d %H:%M} "
+               f"with the {analysis['backend'] or 'keras'} backend"
+               + (f" · this scan was analysed {repeats} times" if repeats > 1 else ""))
+
+    saliency_map, report = load_artifacts(analysis)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Probability Breakdown**")
+        st.dataframe(
+            sorted(({"Class": label, "Probability": round(probability, 4)}
+                    for label, probability in zip(LABELS, analysis["probabilities"])),
+                   key=lambda row: row["Probability"], reverse=True),
+            hide_index=True, use_container_width=True,
+        )
+    with col2:
+        if saliency_map is not None:
+            st.image(saliency_map, caption="Saliency Map", use_container_width=True)
+        else:
+            st.info("The saliency map of this analysis was not retained. Set NEUROLENS_SAVE_SALIENCY_MAPS=1 "
+                    "or NEUROLENS_RESULT_CACHE_DIR to keep saliency maps for later.")
+
+    if analysis["explanation"]:
+        st.write("**Explanation**")
+        st.write(analysis["explanation"])
+
+    if report is not None:
+        data, file_name, mime = report
+        st.download_button("Download Analysis Report", data=data, file_name=file_name, mime=mime,
+                           key=f"history_report_{analysis['id']}", use_container_width=True)
+    else:
+        st.info("The report of this analysis was not retained. Set NEUROLENS_SAVE_REPORTS=1 "
+                "or NEUROLENS_RESULT_CACHE_DIR to keep reports for later.")
+
+
+def render():
+    st.title("Analysis History")
+    store = get_history_store()
+
+    today = date.today()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        date_range = st.date_input("Date range", value=(today - timedelta(days=7), today), max_value=today)
+    with col2:
+        model = st.selectbox("Model", ["All"] + list(MODEL_FILES) + [ENSEMBLE])
+    with col3:
+        prediction = st.selectbox("Prediction", ["All"] + LABELS)
+
+    # While a range is being picked only its start is set
+    if not isinstance(date_range, (tuple, list)):
+        date_range = (date_range,)
+    start, end = (date_range[0], date_range[-1]) if date_range else (today, today)
+    filters = {
+        "model": None if model == "All" else model,
+        "prediction": None if prediction == "All" else prediction,
+        "since": datetime.combine(start, time.min).timestamp(),
+        "until": datetime.combine(end + timedelta(days=1), time.min).timestamp(),
+    }
+
+    total = store.count(**filters)
+    per_class = store.counts("prediction", **filters)
+    columns = st.columns(len(LABELS) + 1)
+    columns[0].metric("Analyses", total)
+    for column, label in zip(columns[1:], LABELS):
+        column.metric(label, per_class.get(label, 0))
+
+    if total == 0:
+        st.info("No analyses match these filters.")
+        return
+
+    pages = math.ceil(total / PAGE_SIZE)
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    analyses = store.query(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, **filters)
+
+    st.dataframe(
+        [{
+            "ID": analysis["id"],
+            "Time": f"{datetime.fromtimestamp(analysis['created_at']):%Y-%m-%d %H:%M}",
+            "File": analysis["filename"],
+            "Model": analysis["model"],
+            "Prediction": analysis["prediction"],
+            "Confidence": f"{analysis['confidence']:.2%}",
+        } for analysis in analyses],
+        hide_index=True, use_container_width=True,
+    )
+
+    selected = st.selectbox(
+        "Open analysis",
+        analyses,
+        format_func=lambda analysis: (f"#{analysis['id']} · {datetime.fromtimestamp(analysis['created_at']):%Y-%m-%d %H:%M}"
+                                      f" · {analysis['filename']} · {analysis['prediction']}"),
+    )
+    if selected is not None:
+        st.markdown("<hr style='margin: 20px 0; border-color: rgba(255,255,255,0.1);'>", unsafe_allow_html=True)
+        show_analysis(selected)
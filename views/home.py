@@ -0,0 +1,130 @@
+"""Home page."""
+import streamlit as st
+
+
+def render():
+    # Create hero section
+    st.markdown("<h1 class='gradient-header' style='text-align: center; font-size: 3rem;'>Welcome to NeuroLens</h1>", unsafe_allow_html=True)
+    st.markdown("<p style='text-align: center; font-size: 1.5rem; margin-bottom: 2rem;'>Advanced Brain Tumor Analysis Using Deep Learning</p>", unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.markdown("""
+        <div class="info-box">
+            <h3>🧠 What is NeuroLens?</h3>
+            <p>NeuroLens is a state-of-the-art deep learning application designed to assist medical professionals in the analysis of brain MRI scans for tumor detection and classification.</p>
+            <p>Using advanced convolutional neural networks and explainable AI, NeuroLens provides detailed insights into brain tumor classification with visual explanations of the model's focus areas.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="warning-box">
+            <h3>⚠️ Important Disclaimer</h3>
+            <p>NeuroLens is a research tool and not a replacement for professional medical diagnosis. All results should be interpreted by qualified healthcare professionals.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with col2:
+        # Static brain MRI image - clean blue theme
+        st.markdown("""
+        <div style="background: rgba(59, 130, 246, 0.1); 
+                    border: 1px solid rgba(59, 130, 246, 0.3);
+                    border-radius: 12px; 
+                    padding: 20px; 
+                    height: 280px;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    flex-direction: column;
+                    text-align: center;">
+            <div style="font-size: 4rem; margin-bottom: 15px;">🧠</div>
+            <h3 style="color: #3b82f6; margin: 0 0 8px 0; font-size: 1.1rem;">Advanced MRI Analysis</h3>
+            <p style="color: #94a3b8; font-size: 0.85rem; margin: 0;">Powered by Deep Learning</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Features section
+    st.markdown("<h2 style='margin-top: 2rem;'>Key Features</h2>", unsafe_allow_html=True)
+    
+    feature_col1, feature_col2, feature_col3 = st.columns(3)
+    
+    with feature_col1:
+        st.markdown("""
+        <div class="card">
+            <h3 style="color: #3b82f6;">🔍 Tumor Classification</h3>
+            <p style="color: #94a3b8;">Classify brain tumors into multiple categories: Glioma, Meningioma, Pituitary, or No Tumor with high accuracy.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with feature_col2:
+        st.markdown("""
+        <div class="card">
+            <h3 style="color: #3b82f6;">🔥 Saliency Maps</h3>
+            <p style="color: #94a3b8;">Visualize which areas of the brain scan the model is focusing on to make its predictions.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with feature_col3:
+        st.markdown("""
+        <div class="card">
+            <h3 style="color: #3b82f6;">📊 AI Analysis</h3>
+            <p style="color: #94a3b8;">Get comprehensive probability scores and expert-like explanations powered by AI.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Call to action
+    st.markdown("<div style='text-align: center; margin-top: 2rem;'>", unsafe_allow_html=True)
+    
+    # Remove the Start Analysis button and styling
+    # Instead, add an informational message
+    st.markdown("""
+    <div style="background: linear-gradient(90deg, rgba(33, 150, 243, 0.1), rgba(33, 150, 243, 0.2));
+                padding: 20px;
+                border-radius: 10px;
+                border-left: 5px solid #2196F3;
+                margin: 20px 0;">
+        <h3 style="color: #2196F3; margin-top: 0;">Ready to Analyze Brain MRI Scans?</h3>
+        <p>You're currently viewing the Home page. Navigate to the <b>Analysis</b> tab in the sidebar to upload and analyze MRI scans.</p>
+        <p>The Analysis tab is the main workspace where you can classify brain tumors using our advanced deep learning models.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Sample results section
+    st.markdown("<h2 style='margin-top: 2rem;'>How It Works</h2>", unsafe_allow_html=True)
+    
+    workflow_col1, workflow_col2, workflow_col3, workflow_col4 = st.columns(4)
+    
+    with workflow_col1:
+        st.markdown("""
+        <div class="card" style="text-align: center;">
+            <h3 style="color: #9C27B0;">1</h3>
+            <p>Upload your brain MRI scan</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with workflow_col2:
+        st.markdown("""
+        <div class="card" style="text-align: center;">
+            <h3 style="color: #9C27B0;">2</h3>
+            <p>Select a deep learning model</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with workflow_col3:
+        st.markdown("""
+        <div class="card" style="text-align: center;">
+            <h3 style="color: #9C27B0;">3</h3>
+            <p>Run the analysis</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+    with workflow_col4:
+        st.markdown("""
+        <div class="card" style="text-align: center;">
+            <h3 style="color: #9C27B0;">4</h3>
+            <p>Review detailed results and explanations</p>
+        </div>
+        """, unsafe_allow_html=True)
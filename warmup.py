@@ -0,0 +1,205 @@
+"""Model warm-up and process readiness.
+
+The first call of a freshly loaded model pays for graph tracing, oneDNN
+kernel selection and buffer allocation. Warm-up moves those costs to process
+start by running dummy batches through the full inference path (prediction,
+gradients and saliency post-processing). A readiness flag reports when it is
+done, so probes and load balancers can hold traffic back until then.
+
+Set ``NEUROLENS_HEALTH_PORT`` to serve the flag next to the Streamlit app:
+``GET /ready`` answers 200 once every model is warm and 503 before that,
+``GET /health`` always answers 200 with the warm-up status and
+``GET /metrics`` serves the process metrics (see metrics.py).
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from metrics import get_metrics
+from models import MODEL_FILES, get_registry
+
+
+def warm_up_model(model_entry, batch_sizes=(1,)):
+    """Run dummy batches through every inference path of ``model_entry``.
+
+    Args:
+        model_entry: Registry entry of the model
+        batch_sizes: Batch sizes to run; kernels are selected per shape, so
+            include the sizes the process will serve
+
+    Returns:
+        A dict mapping each batch size to the seconds its first run took
+    """
+    # Imported here so that importing this module does not load TensorFlow
+    from attribution import ALL_CLASS_SALIENCY
+    from inference import run_class_saliency, run_gradcam, run_inference
+    from saliency import saliency_overlays
+
+    rng = np.random.default_rng(0)
+    timings = {}
+    for batch_size in batch_sizes:
+        images = rng.random((batch_size,) + tuple(model_entry.img_size) + (3,), dtype=np.float32)
+        start = time.perf_counter()
+        model_entry.predict_fn(images)
+        _, gradients = run_inference(model_entry.inference_fn, images)
+        saliency_overlays(gradients, images * 255.0)
+        if model_entry.gradcam_fn is not None:
+            run_gradcam(model_entry.gradcam_fn, images)
+        if ALL_CLASS_SALIENCY:
+            # Tracing the per-class backward passes takes several seconds
+            run_class_saliency(model_entry.class_saliency_fn, images)
+            if model_entry.class_gradcam_fn is not None:
+                run_class_saliency(model_entry.class_gradcam_fn, images)
+        timings[batch_size] = time.perf_counter() - start
+    return timings
+
+
+class Readiness:
+    """Loads and warms up a set of models and reports when they are ready.
+
+    Args:
+        model_keys: Models to warm up, in order
+        registry: Registry to load them from (the process-wide one if None)
+        batch_sizes: Batch sizes passed to ``warm_up_model``
+    """
+
+    def __init__(self, model_keys, registry=None, batch_sizes=(1,)):
+        self.model_keys = list(model_keys)
+        self._registry = registry
+        self.batch_sizes = tuple(batch_sizes)
+        self._lock = threading.Lock()
+        self._models = {model_key: {"state": "pending"} for model_key in self.model_keys}
+        self._thread = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """Warm up in a background thread; calling it again is a no-op."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Warm up every model in the calling thread."""
+        self.started_at = time.time()
+        registry = self._registry or get_registry()
+        for model_key in self.model_keys:
+            self._update(model_key, state="warming")
+            try:
+                entry = registry.get(model_key)
+                timings = warm_up_model(entry, self.batch_sizes)
+            except Exception as e:
+                # A model that cannot serve keeps the process not ready
+                self._update(model_key, state="failed", error=str(e))
+                continue
+            self._update(
+                model_key,
+                state="ready",
+                load_seconds=entry.load_seconds,
+                warmup_seconds={str(size): seconds for size, seconds in timings.items()},
+            )
+        self.finished_at = time.time()
+
+    def wait(self, timeout=None):
+        """Block until warm-up has finished; returns ``ready``."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _update(self, model_key, **fields):
+        with self._lock:
+            self._models[model_key] = fields
+
+    @property
+    def ready(self):
+        with self._lock:
+            return all(model["state"] == "ready" for model in self._models.values())
+
+    def model_status(self, model_key):
+        with self._lock:
+            return dict(self._models.get(model_key, {"state": "not warmed up"}))
+
+    def status(self):
+        with self._lock:
+            models = {model_key: dict(model) for model_key, model in self._models.items()}
+        return {
+            "ready": all(model["state"] == "ready" for model in models.values()),
+            "models": models,
+            "warmup_seconds": (self.finished_at - self.started_at) if self.finished_at else None,
+        }
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    readiness = None
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, get_metrics().render().encode(), "text/plain; version=0.0.4")
+            return
+        status = self.readiness.status()
+        if self.path == "/ready":
+            code = 200 if status["ready"] else 503
+        elif self.path == "/health":
+            code = 200
+        else:
+            code, status = 404, {"error": "not found"}
+        self._send(code, json.dumps(status).encode(), "application/json")
+
+    def _send(self, code, body, content_type):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Probes hit these endpoints every few seconds; keep them out of the logs
+        pass
+
+
+def serve_health(readiness, port, host="0.0.0.0"):
+    """Serve ``/ready``, ``/health`` and ``/metrics`` from a daemon thread."""
+    handler = type("BoundHealthHandler", (HealthHandler,), {"readiness": readiness})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health", daemon=True).start()
+    return server
+
+
+_readiness = None
+_readiness_lock = threading.Lock()
+
+
+def get_readiness():
+    """Return the process-wide readiness tracker, starting warm-up on first use.
+
+    ``NEUROLENS_WARMUP_MODELS`` lists the models to warm up, comma-separated
+    (default: all of ``MODEL_FILES``; ``none`` to skip warm-up), and
+    ``NEUROLENS_HEALTH_PORT`` enables the health and metrics endpoints.
+    """
+    global _readiness
+    if _readiness is None:
+        with _readiness_lock:
+            if _readiness is None:
+                configured = os.environ.get("NEUROLENS_WARMUP_MODELS", ",".join(MODEL_FILES))
+                model_keys = [key.strip() for key in configured.split(",")
+                              if key.strip() and key.strip().lower() != "none"]
+                readiness = Readiness(model_keys)
+                readiness.start()
+                get_metrics().register_stats("warmup", lambda: {"ready": int(readiness.ready)})
+                health_port = os.environ.get("NEUROLENS_HEALTH_PORT")
+                if health_port:
+                    serve_health(readiness, int(health_port))
+                _readiness = readiness
+    return _readiness
+
+
+def peek_readiness():
+    """Return the readiness tracker, or None if warm-up has not started."""
+    return _readiness